@@ -0,0 +1,12 @@
+-- Migration: 025_add_request_source_key.sql
+-- Description: Add a natural key for requests extracted from messages, so the
+--              Python loader (src/thad-request-extractor/request_loader.py) can
+--              upsert them and reruns do not duplicate rows
+-- Date: 2026-10-16
+
+ALTER TABLE requests
+  ADD COLUMN source_key CHAR(40) DEFAULT NULL AFTER source;
+
+-- NULL for requests entered by hand or synced from other sources
+ALTER TABLE requests
+  ADD UNIQUE INDEX uniq_source_key (source_key);
@@ -18,6 +18,7 @@ CREATE TABLE requests (
   effort ENUM('Small', 'Medium', 'Large') DEFAULT 'Medium',
   status ENUM('active', 'deleted', 'ignored') DEFAULT 'active',
   source ENUM('sms', 'ticket', 'email', 'phone', 'fluent') DEFAULT 'sms',
+  source_key CHAR(40) DEFAULT NULL,
   website_url VARCHAR(255) DEFAULT NULL,
   estimated_hours DECIMAL(5, 2) DEFAULT 0.50,
   billing_date DATE DEFAULT NULL,
@@ -30,7 +31,8 @@ CREATE TABLE requests (
   INDEX idx_category (category),
   INDEX idx_status (status),
   INDEX idx_urgency (urgency),
-  INDEX idx_composite (status, date, category)
+  INDEX idx_composite (status, date, category),
+  UNIQUE INDEX uniq_source_key (source_key)
 );
 
 -- Create a view for active requests (convenience)
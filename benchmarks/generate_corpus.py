@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Synthetic iMessage export generator for the pipeline benchmarks.
+
+Writes a raw export in the new 'message'/'sent_at' format that
+process.py consumes. The rows mix what the real exports contain:
+- support requests in the phrasings request_patterns.py looks for, and
+  some that only the work/action keywords catch
+- conversational noise and short acknowledgements
+- iMessage reactions ('Liked "..."', 'Emphasized "..."')
+- export artifacts: 'streamtyped @ NS...' headers, single-character and
+  malformed prefixes, control and object replacement characters, and
+  'iI...NSDictionary' tails
+
+Message lengths follow a log-normal word count, so most messages are
+short and a few run to several paragraphs. Timestamps move forward in
+business-hours bursts across several years. The same rows and seed
+always produce the same file.
+"""
+
+import argparse
+import csv
+import math
+import random
+from datetime import datetime, timedelta
+
+# Named corpus sizes used by run_benchmarks.py
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+# Ten-hour days, about 260 working days a year
+BUSINESS_SECONDS_PER_YEAR = 260 * 10 * 3600
+
+COLUMNS = ['message_id', 'chat_id', 'sender', 'message', 'sent_at']
+
+# (sender, share of rows); 'Thad Norman' and 'Them' are the support
+# agent's messages the extractor keeps
+SENDERS = [('Me', 0.55), ('Them', 0.35), ('Thad Norman', 0.10)]
+
+REQUESTS = [
+    "Can you add the webhook to fluent forms for the {site} contact page",
+    "gravity form webhook on {site} is not firing, can you take a look",
+    "We are doing the nameserver cutover for {site} tonight",
+    "Can you migrate the {site} website to the new server",
+    "Please run a backup of {site} before the update",
+    "Can you zip the site files for {site} and send them over",
+    "Please remove the old quote form from {site}",
+    "Please use this email for the leads from {site}",
+    "Please update the license for the {plugin} plugin",
+    "Can you update the {plugin} plugin on {site}",
+    "Can you fix the broken link in the footer of {site}",
+    "Can you check why {site} is loading slowly",
+    "Can you create a landing page for the spring campaign",
+    "I need you to change the hero image on {site}",
+    "Need help with the checkout page on {site}",
+    "The contact form on {site} is broken, please fix it",
+    "Please add the new team member to the about page",
+]
+
+URGENT = ['asap', 'urgent', 'right away', 'as soon as possible', 'today if you can']
+RELAXED = ['no rush', 'when you get a chance', 'whenever you have time', 'low priority']
+
+NOISE = [
+    "ok", "Thanks!", "Sounds good", "Got it", "Perfect, thank you", "Yes",
+    "No problem", "Will do", "Great work on this", "Talk soon",
+    "I'll let them know", "They said it looks good", "Just saw this",
+    "Heading into a meeting, will call after", "Did you see the game last night",
+    "Happy Friday", "Let me check with the client and get back to you",
+]
+
+FILLER = [
+    "the client mentioned it again on the call",
+    "it has been like this since last week",
+    "they are launching the campaign on Monday",
+    "let me know if you need the login",
+    "I sent the details over email",
+    "it only happens on mobile",
+    "they also asked about the invoice",
+    "the screenshot is in the shared folder",
+]
+
+SITES = ['acme.com', 'peakone.io', 'bluehost-demo.net', 'riverdental.com', 'northside-hvac.com']
+PLUGINS = ['Yoast', 'WP Rocket', 'Elementor', 'Gravity Forms', 'WooCommerce']
+
+STREAMTYPED = 'streamtyped @ NSAttributedString NSObject NSString NSDictionary +'
+SINGLE_CHAR_PREFIXES = ['B', 'K', '4', 'L', ']', '#', '_', '*']
+MALFORMED_PREFIXES = {'Good': 'TGood', 'Please': 'JPlease', 'Thanks': 'JThanks', 'Yes': 'JYes'}
+
+
+def _words(rng: random.Random, median: int) -> int:
+    """A log-normal word count around median."""
+    return max(1, int(rng.lognormvariate(math.log(median), 0.8)))
+
+
+def _request_phrase(rng: random.Random) -> str:
+    """One of the request phrasings, filled in."""
+    return rng.choice(REQUESTS).format(site=rng.choice(SITES), plugin=rng.choice(PLUGINS))
+
+
+def _request(rng: random.Random) -> str:
+    """A support request padded to a realistic length."""
+    text = _request_phrase(rng)
+    roll = rng.random()
+    if roll < 0.12:
+        text += ' ' + rng.choice(URGENT)
+    elif roll < 0.20:
+        text += ', ' + rng.choice(RELAXED)
+    extra = _words(rng, 12) - len(text.split())
+    while extra > 0:
+        clause = rng.choice(FILLER)
+        text += ('. ' if rng.random() < 0.5 else ', ') + clause
+        extra -= len(clause.split())
+    if rng.random() < 0.03:
+        text += '\n\n' + '. '.join(rng.choice(FILLER).capitalize() for _ in range(rng.randint(3, 12)))
+    return text
+
+
+def _noise(rng: random.Random) -> str:
+    """A conversational message, usually short."""
+    text = rng.choice(NOISE)
+    if rng.random() < 0.25:
+        text += ', ' + ', '.join(rng.choice(FILLER) for _ in range(_words(rng, 2)))
+    return text
+
+
+def _reaction(rng: random.Random) -> str:
+    """An iMessage reaction quoting an earlier message."""
+    verb = rng.choice(['Liked', 'Emphasized', 'Loved', 'Laughed at', 'Disliked'])
+    quoted = _request_phrase(rng) if rng.random() < 0.4 else rng.choice(NOISE)
+    return f'{verb} "{quoted[:60]}"'
+
+
+def _with_artifacts(rng: random.Random, text: str) -> str:
+    """Add the export artifacts the cleaner has to remove, to some messages."""
+    roll = rng.random()
+    if roll < 0.08:
+        text = STREAMTYPED + text
+    elif roll < 0.14 and text[:1].isupper():
+        text = rng.choice(SINGLE_CHAR_PREFIXES) + text
+    elif roll < 0.17:
+        for good, bad in MALFORMED_PREFIXES.items():
+            if text.startswith(good):
+                text = bad + text[len(good):]
+                break
+    if rng.random() < 0.05:
+        text += '\ufffc'
+    if rng.random() < 0.03:
+        position = rng.randint(0, len(text))
+        text = text[:position] + '\x0b' + text[position:]
+    if rng.random() < 0.04:
+        text += 'iI NSDictionary'
+    return text
+
+
+def generate_rows(rows: int, seed: int = 0, start: datetime = datetime(2022, 1, 3, 9, 0),
+                  years: int = 3):
+    """Yield rows of a synthetic export, spanning about years, as lists in COLUMNS order."""
+    rng = random.Random(seed)
+    senders, weights = zip(*SENDERS)
+    # Mean gap that spreads the rows over the business hours of the span
+    mean_gap = years * BUSINESS_SECONDS_PER_YEAR / rows
+    moment = start
+    for message_id in range(1, rows + 1):
+        # Bursts of messages during business hours, quiet nights and weekends
+        moment += timedelta(seconds=int(rng.expovariate(1 / mean_gap)))
+        if moment.hour >= 18:
+            moment = (moment + timedelta(days=1)).replace(hour=8, minute=rng.randint(0, 59))
+        while moment.weekday() >= 5 and rng.random() < 0.9:
+            moment += timedelta(days=1)
+
+        sender = rng.choices(senders, weights)[0]
+        roll = rng.random()
+        if sender != 'Me' and roll < 0.35:
+            text = _request(rng)
+        elif roll < 0.45:
+            text = _reaction(rng)
+        else:
+            text = _noise(rng)
+
+        yield [
+            message_id, 'chat100', sender, _with_artifacts(rng, text),
+            moment.strftime('%Y-%m-%d %H:%M:%S')
+        ]
+
+
+def write_corpus(path: str, rows: int, seed: int = 0):
+    """Write a synthetic export of rows messages to path."""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerows(generate_rows(rows, seed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic iMessage export")
+    parser.add_argument('--size', choices=sorted(SIZES), default='10k',
+                        help='Named corpus size (default: 10k)')
+    parser.add_argument('--rows', type=int, default=None,
+                        help='Number of messages, overriding --size')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('--output', '-o', required=True, help='Output CSV path')
+    args = parser.parse_args()
+
+    rows = args.rows or SIZES[args.size]
+    write_corpus(args.output, rows, args.seed)
+    print(f"Wrote {rows} messages to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
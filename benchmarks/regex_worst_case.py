@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Worst-case analysis of the pipeline's regular expressions.
+
+Loads every compiled pattern of the cleaner (MessageCleaner in
+data_preprocessor.py) and the classifier (the rules of rules.json and
+the combined regexes compiled from them, see rule_pack.py), then:
+- flags risky structure in the parse tree: quantifiers nested inside
+  unbounded quantifiers, unbounded quantifiers in sequence that can
+  consume the same characters ('.*?x.*?'), and unanchored patterns
+  whose unbounded quantifier can rescan the text from every start
+  position ('got some .* that')
+- times each pattern, with search() or match() as the pipeline calls it,
+  on generated worst-case inputs of growing length:
+  long pastes of prose, whitespace runs, many short lines, the
+  pattern's own keywords repeated without ever completing a match, and
+  its leading keyword repeated on a line before a final one (for
+  lookaheads anchored to the end of the string)
+
+The growth exponent is fitted over the input lengths: about 1 is linear,
+2 quadratic. Patterns whose time grows faster than --threshold, or that
+do not finish within --timeout, are reported as superlinear; with
+--check that fails the run. Each pattern is timed in a separate process,
+so a catastrophic pattern is killed instead of hanging the run.
+
+    python benchmarks/regex_worst_case.py
+    python benchmarks/regex_worst_case.py --check --output regex_report.json
+    python benchmarks/regex_worst_case.py --pattern 'iI.*(NSDictionary)?$'
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+    from re import _constants as sre_constants
+except ImportError:
+    import sre_constants
+    import sre_parse
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCHMARK_DIR.parent
+sys.path[:0] = [str(REPO_DIR / 'src'), str(REPO_DIR / 'src' / 'thad-request-extractor')]
+
+DEFAULT_SIZES = [1000, 2000, 4000, 8000, 16000]
+DEFAULT_THRESHOLD = 1.5
+DEFAULT_TIMEOUT = 30.0
+# Timings below this are mostly call overhead and left out of the fit
+MIN_FIT_SECONDS = 20e-6
+# Each timing repeats the search until it has run this long
+MIN_TIMING_SECONDS = 0.01
+# An input stops growing once one search takes longer than this
+MAX_CALL_SECONDS = 1.0
+
+# Patterns the pipeline only uses with match(), anchored at the start
+MATCHED_PATTERNS = {'MessageCleaner._prefix_re', 'RulePack.anchored_exclusions'}
+
+UNBOUNDED = sre_constants.MAXREPEAT
+REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT)
+POSSESSIVE_REPEAT = getattr(sre_constants, 'POSSESSIVE_REPEAT', None)
+ATOMIC_GROUP = getattr(sre_constants, 'ATOMIC_GROUP', None)
+
+# Characters the set analysis considers: ASCII plus a few that show up in
+# the exports
+ALPHABET = [chr(code) for code in range(128)] + [' ', '’', '￼', 'é']
+CATEGORIES = {
+    sre_constants.CATEGORY_DIGIT: r'\d', sre_constants.CATEGORY_NOT_DIGIT: r'\D',
+    sre_constants.CATEGORY_SPACE: r'\s', sre_constants.CATEGORY_NOT_SPACE: r'\S',
+    sre_constants.CATEGORY_WORD: r'\w', sre_constants.CATEGORY_NOT_WORD: r'\W',
+}
+
+PROSE = (
+    'the client said the new page looks fine and they will send the logo over '
+    'later this week once marketing signs off on the colors and copy'
+).split()
+
+
+def collect_patterns() -> list:
+    """(name, pattern) for every compiled pattern the pipeline uses."""
+    import request_extractor
+    from data_preprocessor import MessageCleaner
+    from rule_pack import default_rule_pack
+
+    rules = default_rule_pack()
+
+    patterns = [
+        (f'MessageCleaner.{name}', value)
+        for name, value in vars(MessageCleaner()).items() if isinstance(value, re.Pattern)
+    ]
+    patterns += [
+        (f"REQUEST_PATTERNS[{index}] {rule['type']}", rule['pattern'])
+        for index, rule in enumerate(rules.request_patterns)
+    ]
+    patterns += [
+        (f'EXCLUSION_PATTERNS[{index}]', pattern)
+        for index, pattern in enumerate(rules.exclusion_patterns)
+    ]
+    patterns += [
+        (f'RulePack.{name}', value)
+        for name, value in vars(rules).items() if isinstance(value, re.Pattern)
+    ]
+    patterns += [
+        (f'request_extractor.{name}', value)
+        for name, value in vars(request_extractor).items() if isinstance(value, re.Pattern)
+    ]
+    return patterns
+
+
+# Static analysis
+
+def _char_set(op, av, flags: int) -> frozenset:
+    """Characters of ALPHABET a single-character node matches."""
+    ignore_case = flags & re.IGNORECASE
+
+    def variants(char):
+        return {char, char.lower(), char.upper()} if ignore_case else {char}
+
+    if op == sre_constants.LITERAL:
+        return frozenset(variants(chr(av)))
+    if op == sre_constants.NOT_LITERAL:
+        return frozenset(ALPHABET) - variants(chr(av))
+    if op == sre_constants.ANY:
+        return frozenset(c for c in ALPHABET if c != '\n' or flags & re.DOTALL)
+    if op == sre_constants.IN:
+        chars, negate = set(), False
+        for item_op, item_av in av:
+            if item_op == sre_constants.NEGATE:
+                negate = True
+            elif item_op == sre_constants.LITERAL:
+                chars |= variants(chr(item_av))
+            elif item_op == sre_constants.RANGE:
+                low, high = item_av
+                for char in ALPHABET:
+                    if any(low <= ord(v) <= high for v in variants(char)):
+                        chars.add(char)
+            elif item_op == sre_constants.CATEGORY:
+                category = re.compile(CATEGORIES.get(item_av, r'(?!)'))
+                chars |= {char for char in ALPHABET if category.match(char)}
+        return frozenset(ALPHABET) - chars if negate else frozenset(chars)
+    return None
+
+
+def _body_set(items, flags: int):
+    """Characters a repeat body can consume, or None when it is not one character."""
+    if len(items) == 1:
+        op, av = items[0]
+        if op == sre_constants.SUBPATTERN:
+            return _body_set(list(av[-1]), flags)
+        if op == sre_constants.BRANCH:
+            sets = [_body_set(list(branch), flags) for branch in av[1]]
+            return None if None in sets else frozenset().union(*sets)
+        return _char_set(op, av, flags)
+    return None
+
+
+def _has_unbounded(items) -> bool:
+    """Whether a subtree contains an unbounded repeat."""
+    for op, av in items:
+        if op in REPEATS and av[1] == UNBOUNDED:
+            return True
+        for child in _children(op, av):
+            if _has_unbounded(child):
+                return True
+    return False
+
+
+def _children(op, av) -> list:
+    """The item lists nested in a node."""
+    if op in REPEATS or op == POSSESSIVE_REPEAT:
+        return [list(av[2])]
+    if op == sre_constants.SUBPATTERN:
+        return [list(av[-1])]
+    if op == sre_constants.BRANCH:
+        return [list(branch) for branch in av[1]]
+    if op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+        return [list(av[1])]
+    if op == ATOMIC_GROUP:
+        return [list(av)]
+    return []
+
+
+def _scan_sequence(items, flags: int, findings: list):
+    """Flag nested and overlapping quantifiers in one sequence and its children."""
+    for index, (op, av) in enumerate(items):
+        if op in REPEATS and av[1] == UNBOUNDED:
+            body = list(av[2])
+            if _has_unbounded(body) or (len(body) > 1 and any(
+                child_op in REPEATS and child_av[1] > 1 for child_op, child_av in body
+            )):
+                findings.append('nested quantifier')
+            consumed = _body_set(body, flags)
+            if consumed:
+                # A later unbounded repeat that can take over characters this
+                # one consumes, with only characters it also consumes between
+                for later_op, later_av in items[index + 1:]:
+                    if later_op in REPEATS and later_av[1] == UNBOUNDED:
+                        later = _body_set(list(later_av[2]), flags)
+                        if later and consumed & later:
+                            findings.append('overlapping quantifiers in sequence')
+                        break
+                    between = _char_set(later_op, later_av, flags)
+                    if not between or not between <= consumed:
+                        break
+        for child in _children(op, av):
+            _scan_sequence(child, flags, findings)
+
+
+def _is_anchored(items) -> bool:
+    """Whether every match must start at the beginning of the string."""
+    if not items:
+        return False
+    op, av = items[0]
+    if op == sre_constants.AT:
+        return av in (sre_constants.AT_BEGINNING, sre_constants.AT_BEGINNING_STRING)
+    if op == sre_constants.SUBPATTERN:
+        return _is_anchored(list(av[-1]))
+    if op == sre_constants.BRANCH:
+        return all(_is_anchored(list(branch)) for branch in av[1])
+    return False
+
+
+def _rescans(items, flags: int) -> bool:
+    """
+    Whether an unanchored search can rescan the rest of the text from many
+    start positions: an unbounded repeat of a broad set (e.g. '.') after a
+    literal start, which repeats of that start set off again.
+    """
+    for op, av in items:
+        if op in REPEATS and av[1] == UNBOUNDED:
+            consumed = _body_set(list(av[2]), flags)
+            if consumed and len(consumed) > len(ALPHABET) // 2:
+                return True
+        for child in _children(op, av):
+            if _rescans(child, flags):
+                return True
+    return False
+
+
+def analyze_structure(pattern: re.Pattern, anchored: bool = False) -> list:
+    """Risky constructs in a pattern's parse tree; anchored for patterns used with match()."""
+    items = list(sre_parse.parse(pattern.pattern, pattern.flags))
+    findings = []
+    _scan_sequence(items, pattern.flags, findings)
+    if not (anchored or _is_anchored(items)) and _rescans(items, pattern.flags):
+        findings.append('unanchored broad quantifier')
+    return sorted(set(findings))
+
+
+# Adversarial inputs
+
+def _fragments(items) -> list:
+    """Literal runs of a pattern in order, following first alternatives."""
+    fragments, current = [], []
+    for op, av in items:
+        if op == sre_constants.LITERAL:
+            current.append(chr(av))
+            continue
+        if op == sre_constants.IN and av and av[0][0] == sre_constants.LITERAL:
+            current.append(chr(av[0][1]))
+            continue
+        if current:
+            fragments.append(''.join(current))
+            current = []
+        if op == sre_constants.SUBPATTERN:
+            fragments += _fragments(list(av[-1]))
+        elif op == sre_constants.BRANCH:
+            fragments += _fragments(list(av[1][0]))
+        elif op in REPEATS and av[0] > 0:
+            fragments += _fragments(list(av[2]))
+    if current:
+        fragments.append(''.join(current))
+    return [fragment for fragment in fragments if fragment.strip()]
+
+
+def _fill(unit: str, size: int) -> str:
+    """unit repeated to size characters."""
+    return (unit * (size // max(len(unit), 1) + 1))[:size]
+
+
+def adversarial_inputs(pattern: re.Pattern) -> dict:
+    """{name: function of size -> text} of inputs likely to be slow for pattern."""
+    rng = random.Random(0)
+    prose = ' '.join(rng.choice(PROSE) for _ in range(5000))
+    fragments = _fragments(list(sre_parse.parse(pattern.pattern, pattern.flags)))
+    inputs = {
+        'long paste': lambda size: _fill(prose + ' ', size),
+        'whitespace run': lambda size: ' ' * (size - 1) + 'x',
+        'short lines': lambda size: _fill('ok sounds good\n', size),
+    }
+    if fragments:
+        first = fragments[0]
+        # The pattern's keywords over and over, never completing a match
+        incomplete = ' '.join(fragments[:-1]) if len(fragments) > 1 else first[:-1] or first
+        inputs['repeated start'] = lambda size: _fill(first + ' ', size)
+        inputs['repeated partial match'] = lambda size: _fill(incomplete + ' ', size)
+        inputs['partial match lines'] = lambda size: _fill(incomplete + ' \n', size)
+        # Every start on a line that isn't the last, so a match anchored
+        # to the end of the text runs to the line end and backtracks
+        inputs['repeated start before last line'] = (
+            lambda size: _fill(first, size - 2) + '\nx'
+        )
+    return inputs
+
+
+def _time_search(search, text: str) -> float:
+    """Best of three timings of search(text), in seconds per call."""
+    start = time.perf_counter()
+    search(text)
+    once = time.perf_counter() - start
+    if once > MAX_CALL_SECONDS:
+        return once
+    loops = max(1, min(1000, int(MIN_TIMING_SECONDS / once) if once else 1000))
+    best = once
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(loops):
+            search(text)
+        best = min(best, (time.perf_counter() - start) / loops)
+    return best
+
+
+def growth_exponent(sizes: list, seconds: list) -> float:
+    """Least-squares slope of log(time) over log(size), None without two usable points."""
+    points = [
+        (math.log(size), math.log(t)) for size, t in zip(sizes, seconds)
+        if t is not None and t >= MIN_FIT_SECONDS
+    ]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+
+def time_pattern(pattern: re.Pattern, sizes: list, anchored: bool = False) -> dict:
+    """
+    Timings and growth exponent of pattern on each adversarial input. An
+    input's larger sizes are skipped (None) once a search runs past
+    MAX_CALL_SECONDS.
+    """
+    search = pattern.match if anchored else pattern.search
+    results = {}
+    for name, make in adversarial_inputs(pattern).items():
+        seconds = []
+        for size in sizes:
+            if seconds and (seconds[-1] is None or seconds[-1] > MAX_CALL_SECONDS):
+                seconds.append(None)
+            else:
+                seconds.append(_time_search(search, make(size)))
+        exponent = growth_exponent(sizes, seconds)
+        results[name] = {
+            'seconds': [None if value is None else round(value, 9) for value in seconds],
+            'exponent': round(exponent, 2) if exponent is not None else None,
+        }
+    return results
+
+
+def _timed_in_worker(pattern: re.Pattern, sizes: list, anchored: bool, timeout: float) -> dict:
+    """time_pattern in a separate process, None if it ran past timeout."""
+    pool = multiprocessing.get_context('spawn').Pool(1)
+    try:
+        return pool.apply_async(time_pattern, (pattern, sizes, anchored)).get(timeout)
+    except multiprocessing.TimeoutError:
+        return None
+    finally:
+        pool.terminate()
+
+
+def analyze(name: str, pattern: re.Pattern, sizes: list, threshold: float, timeout: float) -> dict:
+    """Structure findings and timings of one pattern."""
+    anchored = name in MATCHED_PATTERNS
+    inputs = _timed_in_worker(pattern, sizes, anchored, timeout)
+    if inputs is None:
+        worst, exponent = 'timeout', None
+    else:
+        worst = max(inputs, key=lambda key: inputs[key]['exponent'] or 0)
+        exponent = inputs[worst]['exponent']
+    return {
+        'name': name,
+        'pattern': pattern.pattern,
+        'flags': pattern.flags,
+        'mode': 'match' if anchored else 'search',
+        'structure': analyze_structure(pattern, anchored),
+        'worst_input': worst,
+        'exponent': exponent,
+        'worst_seconds': max(t for t in inputs[worst]['seconds'] if t is not None) if inputs else None,
+        'superlinear': inputs is None or (exponent or 0) > threshold,
+        'inputs': inputs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find regexes with superlinear worst cases")
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES,
+                        help=f"Input lengths in characters (default: {' '.join(map(str, DEFAULT_SIZES))})")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Growth exponent reported as superlinear (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help=f'Seconds allowed per pattern (default: {DEFAULT_TIMEOUT:g})')
+    parser.add_argument('--pattern', action='append', default=[], metavar='REGEX',
+                        help='Also analyze REGEX, e.g. a rule before adding it (repeatable)')
+    parser.add_argument('--match', default=None, metavar='TEXT',
+                        help='Only analyze pipeline patterns whose name contains TEXT')
+    parser.add_argument('--output', '-o', help='Write the full report to this JSON file')
+    parser.add_argument('--check', action='store_true',
+                        help='Exit with an error if any pattern is superlinear')
+    args = parser.parse_args()
+
+    patterns = collect_patterns()
+    if args.match:
+        patterns = [(name, pattern) for name, pattern in patterns if args.match in name]
+    patterns += [
+        (f'--pattern {index}', re.compile(regex)) for index, regex in enumerate(args.pattern)
+    ]
+
+    print(f"{'pattern':<42} {'growth':>6} {'worst':>9}  worst input / structure")
+    report = []
+    for name, pattern in patterns:
+        result = analyze(name, pattern, sorted(args.sizes), args.threshold, args.timeout)
+        report.append(result)
+        exponent = 'n/a' if result['exponent'] is None else f"n^{result['exponent']:.1f}"
+        worst = '-' if result['worst_seconds'] is None else f"{result['worst_seconds'] * 1000:.2f}ms"
+        marker = '!' if result['superlinear'] else ' '
+        print(f"{marker}{name[:41]:<41} {exponent:>6} {worst:>9}  "
+              f"{result['worst_input']}{' / ' if result['structure'] else ''}"
+              f"{', '.join(result['structure'])}")
+
+    superlinear = [result for result in report if result['superlinear']]
+    print(f"\n{len(superlinear)} of {len(report)} patterns grow faster than "
+          f"n^{args.threshold:g} on their worst input")
+    for result in superlinear:
+        print(f"  {result['name']}: {result['pattern']!r}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'sizes': sorted(args.sizes), 'threshold': args.threshold, 'patterns': report
+            }, f, indent=2)
+            f.write('\n')
+    if args.check and superlinear:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
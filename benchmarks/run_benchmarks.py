@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the Python pipeline.
+
+Times each stage on synthetic corpora from generate_corpus.py:
+- clean: data_preprocessor.process_csv on the raw export
+- clean_workers_N: the same with workers=N, for each N of --workers
+  above 1 (1, 2, 4 and the CPU count by default), to show how the
+  parallel cleaner scales
+- load: RequestExtractor.load_data on the cleaned CSV
+- classify: RequestExtractor.process_messages
+- export: RequestExtractor.export_results (CSV, JSON and Excel)
+- end_to_end: process.py on the raw export, in a scratch directory
+
+Every stage runs in a fresh process, so its peak RSS is its own; the
+setup a stage needs (e.g. loading before classify) is not timed and, on
+Linux, not counted in its peak. Each stage reports wall and CPU time,
+rows in and out, rows/sec on its input and peak RSS.
+
+With --check the results are compared to baseline.json, and the run
+fails when a stage's rows/sec drops, or its peak RSS grows, by more than
+the tolerance. Stages that take well under a second are only checked for
+memory. --update-baseline stores the results as the new baseline.
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --sizes 10k 100k 1m --check
+    python benchmarks/run_benchmarks.py --sizes 100k --update-baseline
+    python benchmarks/run_benchmarks.py --sizes 1m --workers 1 2 4 8
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCHMARK_DIR.parent
+SOURCE_DIRS = [str(REPO_DIR / 'src'), str(REPO_DIR / 'src' / 'thad-request-extractor')]
+sys.path[:0] = [str(BENCHMARK_DIR)] + SOURCE_DIRS
+
+from generate_corpus import SIZES, write_corpus
+from stage_metrics import peak_rss_mb, reset_peak_rss
+
+STAGES = ['clean', 'load', 'classify', 'export', 'end_to_end']
+# Worker counts the clean stage is also timed with
+DEFAULT_WORKERS = sorted({1, 2, 4, os.cpu_count() or 1})
+DEFAULT_SIZES = ['10k', '100k']
+DEFAULT_TOLERANCE = 0.25
+# Stages faster than this in the baseline are too noisy for a throughput
+# check; only their memory is checked
+MIN_CHECKED_SECONDS = 0.5
+BASELINE_FILE = BENCHMARK_DIR / 'baseline.json'
+WORK_DIR = BENCHMARK_DIR / '.cache'
+
+
+def worker_stage(workers: int) -> str:
+    """Name of the clean stage run with workers processes."""
+    return 'clean' if workers == 1 else f'clean_workers_{workers}'
+
+
+def _run_stage(stage: str, paths: dict, rows: int, workers: int = 1) -> dict:
+    """Run one stage in this (fresh) process and measure it, cleaning with workers processes."""
+    from data_preprocessor import process_csv
+    from request_extractor import RequestExtractor
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        extractor = RequestExtractor(paths['cleaned'])
+        if stage in ('classify', 'export'):
+            extractor.load_data()
+        if stage == 'export':
+            extractor.process_messages()
+        os.makedirs(paths['output'], exist_ok=True)
+        reset_peak_rss()
+
+        wall, cpu = time.perf_counter(), time.process_time()
+        if stage == 'clean':
+            process_csv(paths['raw'], paths['cleaned'], workers=workers)
+            rows_in = rows_out = rows
+        elif stage == 'load':
+            extractor.load_data()
+            rows_in, rows_out = rows, len(extractor.df)
+        elif stage == 'classify':
+            extractor.process_messages()
+            rows_in, rows_out = len(extractor.df), len(extractor.requests)
+        elif stage == 'export':
+            extractor.export_results(paths['output'])
+            rows_in = rows_out = len(extractor.requests)
+        else:
+            subprocess.run(
+                [sys.executable, str(REPO_DIR / 'process.py'), '--input', paths['raw']],
+                cwd=paths['scratch'], check=True, stdout=subprocess.DEVNULL,
+                env={**os.environ, 'PYTHONPATH': os.pathsep.join(SOURCE_DIRS)}
+            )
+            with open(os.path.join(paths['scratch'], 'output', 'requests_summary.json')) as f:
+                rows_in, rows_out = rows, json.load(f)['total_requests']
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    return {
+        'seconds': round(wall, 3),
+        'cpu_seconds': round(cpu, 3),
+        'rows_in': rows_in,
+        'rows_out': rows_out,
+        'rows_per_sec': round(rows_in / wall, 1) if wall else None,
+        'peak_rss_mb': round(peak_rss_mb(children=stage == 'end_to_end'), 1),
+    }
+
+
+def corpus_paths(size: str, seed: int, work_dir: Path) -> dict:
+    """Paths for one corpus, generating the raw export if it is not cached."""
+    corpus_dir = work_dir / f'{size}-seed{seed}'
+    (corpus_dir / 'scratch').mkdir(parents=True, exist_ok=True)
+    paths = {
+        'raw': str(corpus_dir / 'raw.csv'),
+        'cleaned': str(corpus_dir / 'cleaned.csv'),
+        'output': str(corpus_dir / 'output'),
+        'scratch': str(corpus_dir / 'scratch'),
+    }
+    if not os.path.exists(paths['raw']):
+        print(f"Generating {size} corpus...")
+        write_corpus(paths['raw'], SIZES[size], seed)
+    return paths
+
+
+def benchmark(size: str, seed: int, repeat: int, work_dir: Path, workers: list = None) -> dict:
+    """Best of repeat runs of every stage, and of clean with each worker count, on one corpus."""
+    paths = corpus_paths(size, seed, work_dir)
+    runs_by_stage = [(stage, stage, 1) for stage in STAGES]
+    runs_by_stage[1:1] = [
+        (worker_stage(count), 'clean', count) for count in sorted(set(workers or [])) if count > 1
+    ]
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for name, stage, count in runs_by_stage:
+        runs = []
+        for _ in range(repeat):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                runs.append(pool.submit(_run_stage, stage, paths, SIZES[size], count).result())
+        results[name] = min(runs, key=lambda run: run['seconds'])
+        result = results[name]
+        speedup = ''
+        if count > 1:
+            result['workers'] = count
+            result['speedup'] = round(results['clean']['seconds'] / result['seconds'], 2)
+            speedup = f"  {result['speedup']:.2f}x"
+        print(f"  {size:>5} {name:<17} {result['seconds']:>8.2f}s "
+              f"{result['rows_per_sec']:>12,.0f} rows/s {result['peak_rss_mb']:>8.1f} MB{speedup}")
+    return results
+
+
+def find_regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    """Stages slower, or using more memory, than the baseline allows."""
+    regressions = []
+    for size, stages in results.items():
+        for stage, result in stages.items():
+            expected = baseline.get('results', {}).get(size, {}).get(stage)
+            if not expected:
+                continue
+            timed = expected['seconds'] >= MIN_CHECKED_SECONDS
+            if timed and result['rows_per_sec'] < expected['rows_per_sec'] * (1 - tolerance):
+                regressions.append(
+                    f"{size} {stage}: {result['rows_per_sec']:,.0f} rows/s, "
+                    f"baseline {expected['rows_per_sec']:,.0f}"
+                )
+            if result['peak_rss_mb'] > expected['peak_rss_mb'] * (1 + tolerance):
+                regressions.append(
+                    f"{size} {stage}: {result['peak_rss_mb']:.1f} MB peak RSS, "
+                    f"baseline {expected['peak_rss_mb']:.1f}"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Python pipeline")
+    parser.add_argument('--sizes', nargs='+', choices=sorted(SIZES), default=DEFAULT_SIZES,
+                        help=f"Corpus sizes to run (default: {' '.join(DEFAULT_SIZES)})")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per stage; the fastest is kept (default: 3)')
+    parser.add_argument('--seed', type=int, default=0, help='Corpus seed (default: 0)')
+    parser.add_argument('--workers', nargs='+', type=int, default=DEFAULT_WORKERS,
+                        help='Worker counts to time the clean stage with '
+                             f"(default: {' '.join(map(str, DEFAULT_WORKERS))})")
+    parser.add_argument('--work-dir', default=str(WORK_DIR),
+                        help='Where corpora and outputs are kept (default: benchmarks/.cache)')
+    parser.add_argument('--output', '-o', help='Also write the results to this JSON file')
+    parser.add_argument('--check', action='store_true',
+                        help='Fail if a stage regressed past the baseline')
+    parser.add_argument('--tolerance', type=float, default=None,
+                        help=f'Allowed regression as a fraction (default: baseline or {DEFAULT_TOLERANCE})')
+    parser.add_argument('--baseline', default=str(BASELINE_FILE),
+                        help='Baseline file (default: benchmarks/baseline.json)')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Store these results as the baseline for the sizes run')
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(f"{'size':>7} {'stage':<17} {'time':>9} {'throughput':>19} {'peak RSS':>11}")
+    results = {
+        size: benchmark(size, args.seed, args.repeat, Path(args.work_dir), args.workers)
+        for size in args.sizes
+    }
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'cpus': os.cpu_count(),
+        'seed': args.seed,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        baseline = {
+            **report,
+            'tolerance': baseline.get('tolerance', DEFAULT_TOLERANCE),
+            'results': {**baseline.get('results', {}), **results},
+        }
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+            f.write('\n')
+        print(f"Baseline updated: {args.baseline}")
+
+    if args.check:
+        tolerance = args.tolerance
+        if tolerance is None:
+            tolerance = baseline.get('tolerance', DEFAULT_TOLERANCE)
+        regressions = find_regressions(results, baseline, tolerance)
+        if regressions:
+            print(f"\nRegressions beyond {tolerance:.0%} of the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {tolerance:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    main()
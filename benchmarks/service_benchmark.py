@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Latency and throughput benchmarks for the classification service.
+
+Starts classification_service.py in a subprocess on a Unix socket (or
+TCP with --tcp) and drives it with keep-alive clients sending messages
+from the synthetic corpus of generate_corpus.py:
+- startup: seconds from launch until the service answers /health
+- latency: one client sending single messages one after another,
+  reported as p50/p95/p99 milliseconds per request
+- concurrent: --clients clients sending single messages at once, with
+  micro-batching and again with max_batch=1, reported as messages/sec
+  and the mean batch size the service saw
+- bulk: requests of --bulk-size messages each, as messages/sec
+
+    python benchmarks/service_benchmark.py
+    python benchmarks/service_benchmark.py --clients 64 --requests 20000 -o service.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCHMARK_DIR.parent
+SOURCE_DIRS = [str(REPO_DIR / 'src'), str(REPO_DIR / 'src' / 'thad-request-extractor')]
+SERVICE = REPO_DIR / 'src' / 'thad-request-extractor' / 'classification_service.py'
+sys.path[:0] = [str(BENCHMARK_DIR)]
+
+from generate_corpus import generate_rows
+
+STARTUP_TIMEOUT = 30.0
+
+
+class Client:
+    """A keep-alive HTTP client for one connection to the service."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, address):
+        """Connect to a Unix socket path or a (host, port) pair."""
+        if isinstance(address, str):
+            return cls(*await asyncio.open_unix_connection(address))
+        return cls(*await asyncio.open_connection(*address))
+
+    async def request(self, method: str, path: str, payload=None) -> dict:
+        """Send one request and return the decoded JSON response."""
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.writer.write(
+            f'{method} {path} HTTP/1.1\r\nHost: localhost\r\n'
+            f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n'
+            .encode('latin-1') + body
+        )
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        response = json.loads(await self.reader.readexactly(length))
+        if status != 200:
+            raise RuntimeError(f'{method} {path} failed with {status}: {response}')
+        return response
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+def start_service(address, extra_args: list) -> subprocess.Popen:
+    """Launch the service listening on address."""
+    if isinstance(address, str):
+        listen = ['--socket', address]
+    else:
+        listen = ['--host', address[0], '--port', str(address[1])]
+    return subprocess.Popen(
+        [sys.executable, str(SERVICE), *listen, *extra_args],
+        env={**os.environ, 'PYTHONPATH': os.pathsep.join(SOURCE_DIRS)},
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_until_ready(address) -> float:
+    """Seconds until the service answers /health."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < STARTUP_TIMEOUT:
+        try:
+            client = await Client.connect(address)
+        except OSError:
+            await asyncio.sleep(0.01)
+            continue
+        await client.request('GET', '/health')
+        await client.close()
+        return time.perf_counter() - start
+    raise RuntimeError(f'Service did not start within {STARTUP_TIMEOUT:.0f}s')
+
+
+async def measure_latency(address, messages: list) -> dict:
+    """Per-request latency of single messages sent one after another."""
+    client = await Client.connect(address)
+    latencies = []
+    for text in messages:
+        start = time.perf_counter()
+        await client.request('POST', '/classify', {'message': text})
+        latencies.append((time.perf_counter() - start) * 1000)
+    await client.close()
+    cuts = statistics.quantiles(latencies, n=100)
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(cuts[49], 3),
+        'p95_ms': round(cuts[94], 3),
+        'p99_ms': round(cuts[98], 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+    }
+
+
+async def measure_throughput(address, messages: list, clients: int, bulk_size: int = None) -> dict:
+    """Messages/sec with clients connections sending messages (or bulk requests) at once."""
+    if bulk_size:
+        payloads = [{'messages': messages[i:i + bulk_size]}
+                    for i in range(0, len(messages), bulk_size)]
+    else:
+        payloads = [{'message': text} for text in messages]
+    connections = [await Client.connect(address) for _ in range(clients)]
+    before = await connections[0].request('GET', '/health')
+
+    async def send(client: Client, share: list):
+        for payload in share:
+            await client.request('POST', '/classify', payload)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        send(client, payloads[index::clients]) for index, client in enumerate(connections)
+    ))
+    seconds = time.perf_counter() - start
+    after = await connections[0].request('GET', '/health')
+    for client in connections:
+        await client.close()
+
+    batches = after['batches'] - before['batches']
+    return {
+        'clients': clients,
+        'requests': len(payloads),
+        'messages': len(messages),
+        'seconds': round(seconds, 3),
+        'messages_per_sec': round(len(messages) / seconds, 1),
+        'batches': batches,
+        'mean_batch': round((after['messages'] - before['messages']) / batches, 2) if batches else None,
+    }
+
+
+async def run_scenarios(address, messages: list, args, batched: bool) -> dict:
+    """Run the scenarios against one service configuration."""
+    results = {'startup_seconds': round(await wait_until_ready(address), 3)}
+    if batched:
+        # Warm up code paths and connections before timing single requests
+        await measure_latency(address, messages[:200])
+        results['latency'] = await measure_latency(address, messages[:args.latency_requests])
+        results['bulk'] = await measure_throughput(address, messages, 1, args.bulk_size)
+    results['concurrent'] = await measure_throughput(address, messages, args.clients)
+    return results
+
+
+def benchmark(args) -> dict:
+    """Every scenario with micro-batching, and the concurrent one without."""
+    messages = [row[3] for row in generate_rows(args.requests, args.seed)]
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'cpus': os.cpu_count(),
+        'seed': args.seed,
+    }
+    with tempfile.TemporaryDirectory() as scratch:
+        for name, extra_args in [('batched', []), ('unbatched', ['--max-batch', '1'])]:
+            if args.tcp:
+                address = ('127.0.0.1', args.port)
+            else:
+                address = os.path.join(scratch, f'{name}.sock')
+            service = start_service(address, extra_args)
+            try:
+                report[name] = asyncio.run(
+                    run_scenarios(address, messages, args, batched=name == 'batched')
+                )
+            finally:
+                service.terminate()
+                service.wait()
+    return report
+
+
+def print_report(report: dict):
+    batched, unbatched = report['batched'], report['unbatched']
+    latency = batched['latency']
+    print(f"startup           {batched['startup_seconds']:>10.3f} s")
+    print(f"latency           p50 {latency['p50_ms']:.3f} ms  p95 {latency['p95_ms']:.3f} ms  "
+          f"p99 {latency['p99_ms']:.3f} ms  ({latency['requests']} sequential requests)")
+    for name, result in [('concurrent', batched['concurrent']),
+                         ('unbatched', unbatched['concurrent']),
+                         ('bulk', batched['bulk'])]:
+        print(f"{name:<17} {result['messages_per_sec']:>10,.0f} msg/s  "
+              f"{result['clients']} clients, mean batch {result['mean_batch']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the classification service")
+    parser.add_argument('--requests', type=int, default=10_000,
+                        help='Messages sent per throughput scenario (default: 10000)')
+    parser.add_argument('--latency-requests', type=int, default=2_000,
+                        help='Sequential requests timed for latency (default: 2000)')
+    parser.add_argument('--clients', type=int, default=32,
+                        help='Concurrent clients (default: 32)')
+    parser.add_argument('--bulk-size', type=int, default=500,
+                        help='Messages per bulk request (default: 500)')
+    parser.add_argument('--seed', type=int, default=0, help='Corpus seed (default: 0)')
+    parser.add_argument('--tcp', action='store_true', help='Use TCP instead of a Unix socket')
+    parser.add_argument('--port', type=int, default=8799, help='TCP port with --tcp (default: 8799)')
+    parser.add_argument('--output', '-o', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    report = benchmark(args)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,181 +1,403 @@
 import csv
+import io
 import re
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
 from pathlib import Path
 
-def clean_message_text(text):
+# Malformed prefixes left behind by the iMessage export, mapped to their fix.
+# Order matters: the first matching entry wins.
+PREFIX_FIXES = {
+    'TGood': 'Good', 'GLmk': 'Lmk', 'GI have': 'I have', "JDon't": "Don't",
+    'kAwesome': 'Awesome', "nThey're": "They're", '.Good': 'Good',
+    '/Laughed': 'Laughed', 'lIt is': 'It is', 'lYeah': 'Yeah',
+    'cI have': 'I have', 'oLiked': 'Liked', 'CLiked': 'Liked',
+    'eSHIP': 'SHIP', '9Ooh': 'Ooh', '4Knew': 'Knew', 'qMaj': 'Maj',
+    'KVery': 'Very', '*Nice': 'Nice', '7Yes': 'Yes', '7All': 'All',
+    'LLove': 'Love', 'JDon': 'Don',
+    # New patterns found in the data
+    'iUp': 'Up', 'JBlueHost': 'BlueHost', '/They': 'They', '2They': 'They',
+    'lI': 'I', 'oK': 'OK', 'jI': 'I', 'OCan': 'Can', 'kGood': 'Good',
+    'SWe': 'We', 'rOperation': 'Operation', '0Phantom': 'Phantom',
+    'QLiked': 'Liked', '0Emphasized': 'Emphasized', '%Emphasized': 'Emphasized',
+    "'Got": 'Got', '.Dropping': 'Dropping',
+    # Additional patterns from recent data
+    'AGood': 'Good', 'JPlease': 'Please', 'AAll': 'All', 'JI': 'I',
+    'AGot': 'Got', 'JThey': 'They', 'AThank': 'Thank', 'JThanks': 'Thanks',
+    'AYeah': 'Yeah', 'JYes': 'Yes', 'ANice': 'Nice', 'JGood': 'Good',
+    'ASounds': 'Sounds', 'JLet': 'Let', 'AWe': 'We', 'JWe': 'We'
+}
+
+# Word starters that mark the rest of a message as real text after a
+# single-character artifact
+COMMON_STARTERS = (
+    "I'", 'I ', 'The', 'They', 'This', 'That', 'We', 'You', 'He', 'She', 'It',
+    'Can', 'Will', 'Could', 'Would', 'Should', 'Please', 'Let', 'All', 'Good',
+    'Yes', 'No', 'OK', 'Alright', 'Sure', 'Thanks', 'Thank'
+)
+
+# Symbols that count as a single-character artifact when followed by uppercase
+ARTIFACT_SYMBOLS = frozenset('.,[]{}()<>!@#$%^&*-+=|\\:;"\'`~_?/><')
+
+# iMessage reactions that are filtered out entirely
+REACTION_VERBS = ('Emphasized', 'Liked', 'Disliked')
+
+
+class MessageCleaner:
     """
-    Cleans a raw message string by removing control characters, known artifacts,
-    and fixing common malformed prefixes.
+    Precompiled message cleaner.
+
+    All patterns and lookup tables are built once in __init__, so cleaning a
+    message is a handful of compiled-regex and string operations instead of
+    recompiling and rebuilding the tables per row.
     """
-    if not text:
-        return ""
-
-    # 0. Remove NSAttributedString artifacts from export_imessages.py output
-    # Pattern: "streamtyped @ [any NS* classes] +"
-    text = re.sub(r'^streamtyped\s+@\s+[^+]+\+', '', text)
-
-    # 1. Remove specific non-printable or problematic characters
-    text = text.replace('￼', '')  # Object replacement character
-    text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F]', '', text)  # Control characters
-
-    # 2. Remove iMessage/macOS specific artifacts like 'iI...NSDictionary'
-    text = re.sub(r'iI.*(NSDictionary)?$', '', text)
-
-    # 3. Remove leading '+' which seems to be a common artifact
-    if text.startswith('+'):
-        text = text[1:]
-
-    # 4. Fix specific malformed prefixes using a dictionary for clarity.
-    # This combines the logic from the various script versions.
-    patterns = {
-        'TGood': 'Good', 'GLmk': 'Lmk', 'GI have': 'I have', "JDon't": "Don't",
-        'kAwesome': 'Awesome', "nThey're": "They're", '.Good': 'Good',
-        '/Laughed': 'Laughed', 'lIt is': 'It is', 'lYeah': 'Yeah',
-        'cI have': 'I have', 'oLiked': 'Liked', 'CLiked': 'Liked',
-        'eSHIP': 'SHIP', '9Ooh': 'Ooh', '4Knew': 'Knew', 'qMaj': 'Maj',
-        'KVery': 'Very', '*Nice': 'Nice', '7Yes': 'Yes', '7All': 'All',
-        'LLove': 'Love', 'JDon': 'Don',
-        # New patterns found in the data
-        'iUp': 'Up', 'JBlueHost': 'BlueHost', '/They': 'They', '2They': 'They',
-        'lI': 'I', 'oK': 'OK', 'jI': 'I', 'OCan': 'Can', 'kGood': 'Good',
-        'SWe': 'We', 'rOperation': 'Operation', '0Phantom': 'Phantom',
-        'QLiked': 'Liked', '0Emphasized': 'Emphasized', '%Emphasized': 'Emphasized',
-        "'Got": 'Got', '.Dropping': 'Dropping',
-        # Additional patterns from recent data
-        'AGood': 'Good', 'JPlease': 'Please', 'AAll': 'All', 'JI': 'I',
-        'AGot': 'Got', 'JThey': 'They', 'AThank': 'Thank', 'JThanks': 'Thanks',
-        'AYeah': 'Yeah', 'JYes': 'Yes', 'ANice': 'Nice', 'JGood': 'Good',
-        'ASounds': 'Sounds', 'JLet': 'Let', 'AWe': 'We', 'JWe': 'We'
-    }
-    for bad_start, good_start in patterns.items():
-        if text.startswith(bad_start):
-            text = good_start + text[len(bad_start):]
-            break  # Assume only one such prefix needs fixing
-    
-    # 5. Handle single character prefixes - comprehensive iMessage artifact removal
-    # More aggressive approach to catch all single character artifacts
-    if len(text) > 1:
+
+    def __init__(self, prefix_fixes=None, common_starters=COMMON_STARTERS):
+        self.prefix_fixes = dict(PREFIX_FIXES if prefix_fixes is None else prefix_fixes)
+        self.common_starters = tuple(common_starters)
+
+        # NSAttributedString header, only ever matched at the start of the
+        # message, then object replacement and control characters in one pass.
+        # Keeping the header out of the character-class pass lets re use its
+        # fast charset scan.
+        self._header_re = re.compile(r'^streamtyped\s+@\s+[^+]+\+')
+        self._control_re = re.compile(r'[\x00-\x08\x0B\x0C\x0E-\x1F\ufffc]')
+        # Anchored alternation in dictionary order keeps first-match-wins
+        self._prefix_re = re.compile(
+            '|'.join(re.escape(bad_start) for bad_start in self.prefix_fixes)
+        )
+        verbs = '|'.join(REACTION_VERBS)
+        self._reaction_re = re.compile(rf'(?:{verbs})\s')
+        self._reaction_quote_re = re.compile(rf'(?:{verbs}) "')
+
+    def _strip_dictionary_artifact(self, text):
+        """
+        Remove an 'iI...NSDictionary' tail from the last line.
+
+        Equivalent to re.sub(r'iI.*(NSDictionary)?$', '', text) without the
+        backtracking: '.' stops at newlines and '$' only matches at the end of
+        the string or before a final newline, so only the first 'iI' on the
+        last line can match.
+        """
+        end = len(text) - 1 if text.endswith('\n') else len(text)
+        line_start = text.rfind('\n', 0, end) + 1
+        index = text.find('iI', line_start, end)
+        if index == -1:
+            return text
+        return text[:index] + text[end:]
+
+    def _strip_single_char_prefix(self, text):
+        """Drop a single-character iMessage artifact in front of real text."""
+        if len(text) <= 1:
+            return text
+
         first_char = text[0]
         rest_of_text = text[1:]
-        
-        # Check if this looks like a single character artifact
-        # Criteria: first character is likely an artifact if:
-        # 1. It's a single letter/number/symbol AND
-        # 2. The rest starts with what looks like a real word/sentence
-        
-        is_likely_artifact = False
-        
+
         # Pattern 1: Single char + uppercase letter (most common)
         # Examples: "BAlright", "LI think", "KI can't", "4I'm", etc.
-        if rest_of_text and rest_of_text[0].isupper():
-            # Single letter/digit/symbol + uppercase = likely artifact
-            is_likely_artifact = (
-                first_char.isalnum() or  # letter or number
-                first_char in '.,[]{}()<>!@#$%^&*-+=|\\:;"\'`~_?/><'  # common symbols
-            )
-        
-        # Pattern 2: Single char + punctuation + common word starters  
+        if rest_of_text[0].isupper() and (
+            first_char.isalnum() or first_char in ARTIFACT_SYMBOLS
+        ):
+            return rest_of_text
+
+        # Pattern 2: Single char + punctuation + common word starters
         # Examples: "K, I'm", "B. We", etc.
-        if not is_likely_artifact and len(rest_of_text) > 3:
-            if rest_of_text[0] in '.,;:!?' and rest_of_text[1] == ' ':
-                # Check what follows the punctuation and space
-                after_punct = rest_of_text[2:]
-                common_starters = ['I\'', 'I ', 'The', 'They', 'This', 'That', 'We', 'You', 'He', 'She', 'It',
-                                  'Can', 'Will', 'Could', 'Would', 'Should', 'Please', 'Let', 'All', 'Good',
-                                  'Yes', 'No', 'OK', 'Alright', 'Sure', 'Thanks', 'Thank']
-                
-                for starter in common_starters:
-                    if after_punct.startswith(starter):
-                        is_likely_artifact = True
-                        # For this case, we want to replace with "OK" not just remove
-                        if first_char.upper() in 'K' and rest_of_text.startswith(', '):
-                            text = 'OK' + rest_of_text
-                        else:
-                            text = rest_of_text
-                        break
-                        
+        if (
+            len(rest_of_text) > 3
+            and rest_of_text[0] in '.,;:!?'
+            and rest_of_text[1] == ' '
+            and rest_of_text[2:].startswith(self.common_starters)
+        ):
+            return rest_of_text
+
         # Pattern 3: Single char + common word starters (no punctuation)
         # Examples: "]I'll", "#I'm", "_They", etc.
-        if not is_likely_artifact and len(rest_of_text) > 2:
-            common_starters = ['I\'', 'I ', 'The', 'They', 'This', 'That', 'We', 'You', 'He', 'She', 'It', 
-                              'Can', 'Will', 'Could', 'Would', 'Should', 'Please', 'Let', 'All', 'Good', 
-                              'Yes', 'No', 'OK', 'Alright', 'Sure', 'Thanks', 'Thank']
-            
-            for starter in common_starters:
-                if rest_of_text.startswith(starter):
-                    is_likely_artifact = True
-                    break
-        
-        # Apply the fix if it looks like an artifact
-        if is_likely_artifact:
-            text = rest_of_text
-
-    # 6. Remove iMessage reaction prefixes that should be filtered out entirely
-    # Check for these patterns anywhere in the text, not just at the beginning
-    if any(phrase in text for phrase in ['Emphasized "', 'Liked "', 'Disliked "']):
-        return ""  # Return empty string for these reaction messages
-    
-    # Also check for these patterns with just space after (no quotes)
-    reaction_patterns = [
-        r'.*Emphasized\s+.*$',       # Matches 'Emphasized ' anywhere in text
-        r'.*Liked\s+.*$',           # Matches 'Liked ' anywhere in text
-        r'.*Disliked\s+.*$'         # Matches 'Disliked ' anywhere in text
-    ]
-    
-    for pattern in reaction_patterns:
-        if re.match(pattern, text):
-            return ""  # Return empty string for these reaction messages
-    
-    # 7. Clean up doubled quotes, a common artifact from CSV exporting
-    if text.startswith('""') and text.endswith('""'):
-        text = text[1:-1]
-
-    # 8. Final strip of any leading/trailing whitespace
-    return text.strip()
-
-def process_csv(input_file, output_file):
-    """Reads a CSV, cleans the 'message_text' or 'message' column, and writes to a new CSV."""
+        if len(rest_of_text) > 2 and rest_of_text.startswith(self.common_starters):
+            return rest_of_text
+
+        return text
+
+    def is_reaction(self, text):
+        """
+        Check for iMessage reaction messages in one linear scan.
+
+        Matches the same messages as the old '.*Emphasized\\s+.*$'-style
+        re.match checks: the verb must sit on the first line, and whatever
+        follows its whitespace run may not contain a newline other than a
+        final one.
+        """
+        last_newline = text.rfind('\n', 0, len(text) - 1)
+        if last_newline == -1:
+            return self._reaction_re.search(text) is not None
+
+        if self._reaction_quote_re.search(text):
+            return True
+
+        head = text[:last_newline + 1].rstrip()
+        return head.endswith(REACTION_VERBS) and '\n' not in head
+
+    def clean(self, text):
+        """
+        Cleans a raw message string by removing control characters, known artifacts,
+        and fixing common malformed prefixes.
+        """
+        if not text:
+            return ""
+
+        # 0. Remove NSAttributedString artifacts from export_imessages.py output
+        # Pattern: "streamtyped @ [any NS* classes] +"
+        if text.startswith('streamtyped'):
+            text = self._header_re.sub('', text)
+
+        # 1. Remove object replacement and control characters
+        text = self._control_re.sub('', text)
+
+        # 2. Remove iMessage/macOS specific artifacts like 'iI...NSDictionary'
+        text = self._strip_dictionary_artifact(text)
+
+        # 3. Remove leading '+' which seems to be a common artifact
+        if text.startswith('+'):
+            text = text[1:]
+
+        # 4. Fix specific malformed prefixes (only one needs fixing)
+        match = self._prefix_re.match(text)
+        if match:
+            bad_start = match.group()
+            text = self.prefix_fixes[bad_start] + text[len(bad_start):]
+
+        # 5. Handle single character prefixes
+        text = self._strip_single_char_prefix(text)
+
+        # 6. Remove iMessage reaction messages entirely
+        if self.is_reaction(text):
+            return ""
+
+        # 7. Clean up doubled quotes, a common artifact from CSV exporting
+        if text.startswith('""') and text.endswith('""'):
+            text = text[1:-1]
+
+        # 8. Final strip of any leading/trailing whitespace
+        return text.strip()
+
+    def clean_series(self, series):
+        """
+        Clean a whole pandas Series of messages, with missing values cleaned
+        to "". Produces the same values as calling clean() on every element.
+        """
+        # pandas' str methods on object columns loop in Python too, and
+        # mapping clean() measured faster than chaining them rule by rule
+        return series.fillna('').astype(str).map(self.clean)
+
+
+_default_cleaner = MessageCleaner()
+
+
+def clean_message_text(text):
+    """
+    Cleans a raw message string by removing control characters, known artifacts,
+    and fixing common malformed prefixes.
+    """
+    return _default_cleaner.clean(text)
+
+
+def clean_series(series):
+    """Clean a pandas Series of message texts in one batch."""
+    return _default_cleaner.clean_series(series)
+
+
+def clean_column(df):
+    """
+    Clean the message column of a DataFrame in one batch.
+
+    Applies the same column mapping as process_csv: the new export format's
+    'message'/'sent_at' columns are renamed to 'message_text'/'message_date'.
+    Returns a new DataFrame.
+    """
+    df = df.copy()
+    if 'message' in df.columns and 'message_text' not in df.columns:
+        df['message'] = clean_series(df['message'])
+        df = df.rename(columns={'message': 'message_text', 'sent_at': 'message_date'})
+    elif 'message_text' in df.columns:
+        df['message_text'] = clean_series(df['message_text'])
+    return df
+
+# Rows handed to each worker by process_csv(workers=N)
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def _clean_row(row):
+    """Clean one DictReader row in place, mapping new-format column names."""
+    # Handle both old and new column names
+    if 'message' in row:
+        cleaned_text = clean_message_text(row.get('message'))
+        row['message'] = cleaned_text
+        # Map to expected column names
+        if 'sent_at' in row:
+            row['message_date'] = row.pop('sent_at')
+        row['message_text'] = row.pop('message')
+    elif 'message_text' in row:
+        row['message_text'] = clean_message_text(row.get('message_text'))
+    return row
+
+
+def _clean_rows(fieldnames, rows):
+    """
+    Turn raw csv.reader rows into dicts the same way csv.DictReader does and
+    clean them.
+    """
+    field_count = len(fieldnames)
+    cleaned = []
+    for values in rows:
+        row = dict(zip(fieldnames, values))
+        if field_count < len(values):
+            row[None] = values[field_count:]
+        elif field_count > len(values):
+            for key in fieldnames[len(values):]:
+                row[key] = None
+        cleaned.append(_clean_row(row))
+    return cleaned
+
+
+def _clean_chunk(fieldnames, output_fieldnames, rows):
+    """
+    Worker task for process_csv: clean a chunk of raw rows and serialize it
+    with DictWriter.
+
+    Returns the CSV text for the chunk and its row count.
+    """
+    cleaned = _clean_rows(fieldnames, rows)
+    buffer = io.StringIO(newline='')
+    writer = csv.DictWriter(buffer, fieldnames=output_fieldnames)
+    writer.writerows(cleaned)
+    return buffer.getvalue(), len(cleaned)
+
+
+def output_fieldnames(fieldnames):
+    """The cleaned CSV's column names, with the new export format's renamed."""
+    # If we have the new export format, rename columns for compatibility
+    if 'message' in fieldnames and 'message_text' not in fieldnames:
+        return [
+            'message_text' if col == 'message' else
+            'message_date' if col == 'sent_at' else
+            col for col in fieldnames
+        ]
+    return fieldnames.copy()
+
+
+def _iter_chunks(reader, chunk_size):
+    """Yield lists of non-blank rows from a csv.reader."""
+    chunk = []
+    for row in reader:
+        if not row:
+            continue  # csv.DictReader skips blank lines
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _map_chunks(task, chunks, workers):
+    """
+    Apply task to every chunk, yielding results in input order.
+
+    With workers > 1 the chunks are processed in a process pool with at most
+    two chunks per worker in flight, so memory stays bounded by the chunk
+    size rather than the file size.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield task(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(task, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_cleaned_rows(input_file, workers=1, chunk_size=DEFAULT_CHUNK_SIZE, output_file=None,
+                      start_row=0, index=None):
+    """
+    Stream the cleaned rows of a message export in chunks.
+
+    Yields (fieldnames, rows) per chunk, where rows are dicts keyed by the
+    output column names, in input order. When output_file is given the
+    cleaned CSV is written alongside as a side output, identical to
+    process_csv's. The first start_row data rows are skipped without being
+    cleaned (or written), and so are the rows already in index, a
+    message_index.MessageIndex, which indexes the rest.
+
+    Raises ValueError if the input has no header.
+    """
+    with open(input_file, 'r', encoding='utf-8') as infile:
+        reader = csv.reader(infile)
+        fieldnames = next(reader, None)
+        if not fieldnames:
+            raise ValueError(f"Input file '{input_file}' is empty or has no header.")
+        cleaned_fieldnames = output_fieldnames(fieldnames)
+
+        outfile = writer = None
+        if output_file:
+            outfile = open(output_file, 'w', encoding='utf-8', newline='')
+            writer = csv.DictWriter(outfile, fieldnames=cleaned_fieldnames)
+            writer.writeheader()
+        try:
+            task = partial(_clean_rows, fieldnames)
+            chunks = _iter_chunks(islice(filter(None, reader), start_row, None), chunk_size)
+            if index is not None:
+                chunks = filter(None, (index.new_rows(fieldnames, rows) for rows in chunks))
+            for rows in _map_chunks(task, chunks, workers):
+                if writer:
+                    writer.writerows(rows)
+                yield cleaned_fieldnames, rows
+        finally:
+            if outfile:
+                outfile.close()
+
+
+def process_csv(input_file, output_file, workers=1, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Reads a CSV, cleans the 'message_text' or 'message' column, and writes to a new CSV.
+    Returns the number of rows written, or None if the input could not be read.
+
+    With workers > 1 the rows are cleaned in chunks across a process pool and
+    written back in their original order; the output is byte-identical to the
+    serial path.
+    """
     try:
         with open(input_file, 'r', encoding='utf-8') as infile, \
              open(output_file, 'w', encoding='utf-8', newline='') as outfile:
 
-            reader = csv.DictReader(infile)
-            if not reader.fieldnames:
+            reader = csv.reader(infile)
+            fieldnames = next(reader, None)
+            if not fieldnames:
                 print(f"Error: Input file '{input_file}' is empty or has no header.")
                 return
 
             # Map the new format to expected format for downstream processing
-            output_fieldnames = reader.fieldnames.copy()
-
-            # If we have the new export format, rename columns for compatibility
-            if 'message' in reader.fieldnames and 'message_text' not in reader.fieldnames:
-                output_fieldnames = [
-                    'message_text' if col == 'message' else
-                    'message_date' if col == 'sent_at' else
-                    col for col in output_fieldnames
-                ]
+            cleaned_fieldnames = output_fieldnames(fieldnames)
 
-            writer = csv.DictWriter(outfile, fieldnames=output_fieldnames)
+            writer = csv.DictWriter(outfile, fieldnames=cleaned_fieldnames)
             writer.writeheader()
 
             row_count = 0
-            for row in reader:
-                # Handle both old and new column names
-                if 'message' in row:
-                    cleaned_text = clean_message_text(row.get('message'))
-                    row['message'] = cleaned_text
-                    # Map to expected column names
-                    if 'sent_at' in row:
-                        row['message_date'] = row.pop('sent_at')
-                    row['message_text'] = row.pop('message')
-                elif 'message_text' in row:
-                    row['message_text'] = clean_message_text(row.get('message_text'))
-
-                writer.writerow(row)
-                row_count += 1
+            task = partial(_clean_chunk, fieldnames, cleaned_fieldnames)
+            for text, count in _map_chunks(task, _iter_chunks(reader, chunk_size), workers):
+                outfile.write(text)
+                row_count += count
 
         print(f"Processed {row_count} rows. Cleaned data saved to: {output_file}")
+        return row_count
     except FileNotFoundError:
         print(f"Error: Input file not found at '{input_file}'")
     except Exception as e:
@@ -0,0 +1,157 @@
+"""
+Content-addressed index of raw messages, for reading overlapping exports.
+
+Messages are keyed by sender, message_date and a hash of the message text
+as exported, before cleaning, so the same message read from two exports
+(or twice from one) has the same key and editing the cleaner doesn't
+invalidate the index. The index lives in SQLite keyed on all three:
+checking a chunk of rows is a few primary key lookups, so reading a new
+export costs time in proportion to that export, not to everything
+indexed before it.
+
+A message is its key, so repeats of one within an export (the same
+sender, message_date and text) are read once, where full and watermark
+runs keep every copy.
+"""
+
+import csv
+import hashlib
+import sqlite3
+from typing import Iterable, List
+
+from data_preprocessor import DEFAULT_CHUNK_SIZE, iter_cleaned_rows, output_fieldnames
+
+# Raw column names of the key fields, in the new and the old export format
+SENDER_COLUMNS = ('sender',)
+DATE_COLUMNS = ('sent_at', 'message_date')
+TEXT_COLUMNS = ('message', 'message_text')
+
+
+def text_hash(text: str) -> bytes:
+    """Hash a raw message text for the index."""
+    return hashlib.blake2b((text or '').encode('utf-8'), digest_size=16).digest()
+
+
+def _column(fieldnames: List[str], names) -> int:
+    """Position of the first of names in fieldnames, or None."""
+    return next((fieldnames.index(name) for name in names if name in fieldnames), None)
+
+
+class MessageIndex:
+    """
+    SQLite index of the messages read so far (in memory by default).
+
+    new_rows() drops the rows already indexed and indexes the rest inside
+    an open transaction: commit() keeps them for later runs, rollback()
+    forgets them, so a run that fails before exporting doesn't hide its
+    messages from the next one.
+    """
+
+    def __init__(self, path: str = ':memory:'):
+        self.path = path
+        self.added = 0
+        self.duplicates = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS messages (
+                message_date TEXT NOT NULL,
+                sender TEXT NOT NULL,
+                text_hash BLOB NOT NULL,
+                PRIMARY KEY (message_date, sender, text_hash)
+            ) WITHOUT ROWID
+        ''')
+        # A chunk's keys, joined against the index in one query
+        self._conn.execute('''
+            CREATE TEMP TABLE chunk (
+                message_date TEXT NOT NULL,
+                sender TEXT NOT NULL,
+                text_hash BLOB NOT NULL
+            )
+        ''')
+
+    def is_empty(self) -> bool:
+        """Whether no message has been indexed yet."""
+        return self._conn.execute('SELECT 1 FROM messages LIMIT 1').fetchone() is None
+
+    def _existing(self, keys: List[tuple]) -> set:
+        """The keys already in the index."""
+        self._conn.execute('DELETE FROM chunk')
+        self._conn.executemany('INSERT INTO chunk VALUES (?, ?, ?)', keys)
+        return set(self._conn.execute(
+            'SELECT message_date, sender, text_hash FROM chunk '
+            'JOIN messages USING (message_date, sender, text_hash)'
+        ))
+
+    def new_rows(self, fieldnames: List[str], rows: List[List[str]]) -> List[List[str]]:
+        """
+        The raw csv.reader rows not indexed yet, in order, with each of them
+        indexed. Repeats within rows are dropped too.
+        """
+        columns = [_column(fieldnames, names)
+                   for names in (DATE_COLUMNS, SENDER_COLUMNS, TEXT_COLUMNS)]
+
+        def field(row, position):
+            return row[position] if position is not None and position < len(row) else ''
+
+        keys = {}
+        for position, row in enumerate(rows):
+            key = (field(row, columns[0]), field(row, columns[1]), text_hash(field(row, columns[2])))
+            keys.setdefault(key, position)
+        for key in self._existing(list(keys)):
+            del keys[key]
+
+        self._conn.executemany(
+            'INSERT INTO messages (message_date, sender, text_hash) VALUES (?, ?, ?)', keys
+        )
+        self.added += len(keys)
+        self.duplicates += len(rows) - len(keys)
+        return [rows[position] for position in sorted(keys.values())]
+
+    def clear(self):
+        """Forget every indexed message."""
+        self._conn.execute('DELETE FROM messages')
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        """Close the index, forgetting anything not committed."""
+        self._conn.close()
+
+
+def iter_unique_rows(input_files: Iterable[str], index: MessageIndex, workers: int = 1,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE, output_file: str = None):
+    """
+    Stream the cleaned rows of several exports in one pass, skipping the
+    messages already in index.
+
+    Yields (fieldnames, rows) chunks like iter_cleaned_rows, export by
+    export. Duplicates are dropped before cleaning. When output_file is
+    given the cleaned CSV is written alongside, with the first export's
+    columns.
+    """
+    input_files = list(input_files)
+    outfile = writer = None
+    if output_file and input_files:
+        with open(input_files[0], 'r', encoding='utf-8') as infile:
+            header = next(csv.reader(infile), None)
+        if not header:
+            raise ValueError(f"Input file '{input_files[0]}' is empty or has no header.")
+        outfile = open(output_file, 'w', encoding='utf-8', newline='')
+        writer = csv.DictWriter(outfile, fieldnames=output_fieldnames(header),
+                                restval='', extrasaction='ignore')
+        writer.writeheader()
+    try:
+        for input_file in input_files:
+            for fieldnames, rows in iter_cleaned_rows(
+                input_file, workers=workers, chunk_size=chunk_size, index=index
+            ):
+                if writer:
+                    writer.writerows(rows)
+                yield fieldnames, rows
+    finally:
+        if outfile:
+            outfile.close()
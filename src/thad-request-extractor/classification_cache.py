@@ -0,0 +1,157 @@
+"""
+Persistent on-disk cache of message classifications.
+
+Entries are keyed by a hash of the message text under a fingerprint of the
+rules in rules.json, so editing a rule starts a fresh version while
+entries for other versions age out through LRU eviction.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from itertools import islice
+from typing import Dict, Optional, Tuple
+
+from rule_pack import RulePack, default_rule_pack
+
+# Bump when RequestExtractor's classification logic changes in a way the
+# rule fingerprint cannot see (e.g. hard-coded checks in the extractor).
+CLASSIFIER_VERSION = 1
+
+DEFAULT_MAX_ENTRIES = 500_000
+
+# (request_type, category, effort, urgency)
+Classification = Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]
+
+
+def rules_fingerprint(pack: RulePack = None) -> str:
+    """Fingerprint the compiled rule set and keyword lists (the bundled rules by default)."""
+    if pack is None:
+        pack = default_rule_pack()
+    rules = {
+        'classifier_version': CLASSIFIER_VERSION,
+        'request_patterns': [
+            [p['pattern'].pattern, p['pattern'].flags, p['type'], p['category'], p['default_effort']]
+            for p in pack.request_patterns
+        ],
+        'exclusion_patterns': [[p.pattern, p.flags] for p in pack.exclusion_patterns],
+        'urgency_indicators': pack.urgency_indicators,
+        'action_keywords': pack.action_keywords,
+        'work_keywords': pack.work_keywords,
+        'non_request_phrases': pack.non_request_phrases,
+        'reaction_keywords': pack.reaction_keywords,
+    }
+    encoded = json.dumps(rules, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def text_key(text: str) -> str:
+    """Hash a message text into a cache key."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class ClassificationCache:
+    """
+    SQLite-backed classification cache.
+
+    The entries for the current rules version are read into memory when the
+    cache is opened; lookups are dictionary hits and new entries and
+    recency updates are written back in one transaction by flush(). flush()
+    also keeps the in-memory entries to max_entries, dropping the least
+    recently used, so a long-running process doesn't grow without bound.
+    """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 rules_version: str = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.rules_version = rules_version or rules_fingerprint()
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS classifications (
+                rules_version TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                request_type TEXT,
+                category TEXT,
+                effort TEXT,
+                urgency TEXT,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (rules_version, text_hash)
+            )
+        ''')
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_classifications_last_used '
+            'ON classifications (last_used)'
+        )
+        self._entries: Dict[str, Classification] = {
+            row[0]: tuple(row[1:])
+            for row in self._conn.execute(
+                'SELECT text_hash, request_type, category, effort, urgency '
+                'FROM classifications WHERE rules_version = ?',
+                (self.rules_version,)
+            )
+        }
+        self._used = set()
+        self._new: Dict[str, Classification] = {}
+
+    def get(self, text: str) -> Optional[Classification]:
+        """Return the cached classification for a message, if any."""
+        key = text_key(text)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._used.add(key)
+        return entry
+
+    def put(self, text: str, classification: Classification):
+        """Record a classification; written to disk on flush()."""
+        key = text_key(text)
+        self._entries[key] = classification
+        self._new[key] = classification
+
+    def pending(self) -> int:
+        """New entries and recency updates not written yet."""
+        return len(self._new) + len(self._used)
+
+    def flush(self):
+        """Write new entries and recency updates, then evict the oldest entries."""
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO classifications '
+                '(rules_version, text_hash, request_type, category, effort, urgency, last_used) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(self.rules_version, key, *entry, now) for key, entry in self._new.items()]
+            )
+            self._conn.executemany(
+                'UPDATE classifications SET last_used = ? '
+                'WHERE rules_version = ? AND text_hash = ?',
+                [(now, self.rules_version, key) for key in self._used - self._new.keys()]
+            )
+            (count,) = self._conn.execute('SELECT COUNT(*) FROM classifications').fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    'DELETE FROM classifications WHERE rowid IN ('
+                    'SELECT rowid FROM classifications ORDER BY last_used LIMIT ?)',
+                    (count - self.max_entries,)
+                )
+        # Keep the in-memory entries in least recently used order
+        for key in self._used:
+            self._entries[key] = self._entries.pop(key)
+        self._used.clear()
+        self._new.clear()
+        excess = len(self._entries) - self.max_entries
+        if excess > 0:
+            for key in list(islice(self._entries, excess)):
+                del self._entries[key]
+
+    def close(self):
+        """Flush pending writes and close the database."""
+        self.flush()
+        self._conn.close()
@@ -0,0 +1,417 @@
+"""
+Long-running classification service.
+
+Keeps a RequestExtractor and its compiled rule pack warm so single
+messages can be classified without starting the pipeline. The service
+speaks a small subset of HTTP/1.1 (with keep-alive) over TCP or a Unix
+socket:
+
+    POST /classify  {"message": "..."}        -> {"classification": {...}}
+    POST /classify  {"messages": ["...", ...]} -> {"classifications": [...]}
+    GET  /health                               -> rules hash and batch counters
+
+A classification holds request_type, category, effort and urgency, all
+null for messages that are not requests, exactly as the pipeline would
+classify the same text.
+
+Requests that arrive together are classified as one micro-batch: the
+batcher takes everything queued (up to max_batch messages, optionally
+waiting max_wait_ms for more), classifies each distinct text once on a
+single classification thread and answers every request from the batch.
+While one batch is being classified the next one queues up, so batches
+grow with load without making a lone request wait. Batches of at least
+vectorize_from distinct texts go through the column-wise classify_series;
+smaller ones are classified message by message, which is faster at the
+batch sizes a service sees.
+
+The rules file is checked for edits between batches and a new pack is
+swapped in without dropping requests (see rule_pack.RulePackStore).
+With a classification cache, new classifications are written to it
+between batches once enough are pending, every few seconds while idle
+and on shutdown, including on SIGTERM and SIGINT.
+
+    python src/thad-request-extractor/classification_service.py --port 8765
+    python src/thad-request-extractor/classification_service.py --socket /tmp/classify.sock
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from classification_cache import Classification
+from request_extractor import RequestExtractor
+from rule_pack import RULES_FILE, RulePackStore
+
+CLASSIFICATION_FIELDS = ['request_type', 'category', 'effort', 'urgency']
+
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH = 1024
+DEFAULT_MAX_WAIT_MS = 0.0
+# Seconds between checks of the rules file for edits
+RULES_CHECK_SECONDS = 1.0
+# Classification cache writes pending before they are flushed to disk,
+# and the longest they wait
+CACHE_FLUSH_ENTRIES = 10_000
+CACHE_FLUSH_SECONDS = 5.0
+# Largest request body accepted, and most messages in one request
+MAX_BODY_BYTES = 8 * 1024 * 1024
+MAX_MESSAGES = 10_000
+
+STATUS_TEXT = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    413: 'Payload Too Large', 500: 'Internal Server Error',
+}
+
+
+class RequestError(Exception):
+    """A client error, answered with its HTTP status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _as_dict(classification: Classification) -> Dict:
+    """A classification tuple as the JSON object the service returns."""
+    return {
+        field: (None if pd.isna(value) else value)
+        for field, value in zip(CLASSIFICATION_FIELDS, classification)
+    }
+
+
+class ClassificationService:
+    def __init__(self, rules_path: str = RULES_FILE, rule_pack_cache: str = None,
+                 cache_path: str = None, max_batch: int = DEFAULT_MAX_BATCH,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS, vectorize_from: int = None):
+        """
+        Set up the service; start() loads the rules and starts batching.
+
+        rules_path is watched for edits; rule_pack_cache and cache_path are
+        the compiled rule pack and classification caches, both optional.
+        With max_batch=1 every request is classified on its own.
+        """
+        self.rules_path = rules_path
+        self.rule_pack_cache = rule_pack_cache
+        self.cache_path = cache_path
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.vectorize_from = vectorize_from
+
+        self.store: Optional[RulePackStore] = None
+        self.extractor: Optional[RequestExtractor] = None
+        self.queue: Optional[asyncio.Queue] = None
+        # One thread owns the extractor (and its SQLite cache connection)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='classify')
+        self._batcher: Optional[asyncio.Task] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._rules_checked = 0.0
+        self._cache_flushed = 0.0
+        self.stats = {'requests': 0, 'messages': 0, 'batches': 0, 'largest_batch': 0,
+                      'classify_seconds': 0.0, 'rule_reloads': 0}
+
+    def _load(self):
+        """Load the rules and build the extractor, on the classification thread."""
+        self.store = RulePackStore(self.rules_path, self.rule_pack_cache)
+        self.extractor = RequestExtractor(cache_path=self.cache_path, rules=self.store.pack)
+        self._rules_checked = self._cache_flushed = time.monotonic()
+
+    def _check_rules(self):
+        """Swap in the rules file's new pack if it was edited, at most once per interval."""
+        now = time.monotonic()
+        if now - self._rules_checked < RULES_CHECK_SECONDS:
+            return
+        self._rules_checked = now
+        try:
+            if self.store.reload():
+                self.extractor.use_rules(self.store.pack)
+                self.stats['rule_reloads'] += 1
+                print(f"Reloaded rules from {self.rules_path}", file=sys.stderr)
+        except (OSError, ValueError) as e:
+            print(f"Keeping current rules, cannot reload {self.rules_path}: {e}", file=sys.stderr)
+
+    def _flush_cache(self):
+        """
+        Write pending classifications to the cache once enough are pending
+        or the oldest has waited long enough, on the classification thread.
+        """
+        cache = self.extractor.cache
+        if cache is None or not cache.pending():
+            return
+        now = time.monotonic()
+        if cache.pending() >= CACHE_FLUSH_ENTRIES or now - self._cache_flushed >= CACHE_FLUSH_SECONDS:
+            cache.flush()
+            self._cache_flushed = now
+
+    def classify_batch(self, texts: List[str]) -> Dict[str, Classification]:
+        """Classify each distinct text of a batch, on the classification thread."""
+        self._check_rules()
+        distinct = list(dict.fromkeys(texts))
+        if self.vectorize_from and len(distinct) >= self.vectorize_from:
+            classified = self.extractor.classify_series(pd.Series(distinct, dtype=object))
+            results = dict(zip(distinct, classified.itertuples(index=False, name=None)))
+        else:
+            results = {text: self.extractor.classify_message(text) for text in distinct}
+        self._flush_cache()
+        return results
+
+    async def start(self):
+        """Load the rules and start the batcher."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self._load)
+        self.queue = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._run_batches())
+        if self.extractor.cache is not None:
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self):
+        """Stop the batcher and close (and so flush) the classification cache."""
+        for task in (self._batcher, self._flusher):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        if self.extractor is not None and self.extractor.cache is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.extractor.cache.close
+            )
+        self.executor.shutdown()
+
+    async def _flush_periodically(self):
+        """Flush classifications left pending while no batches arrive, until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(CACHE_FLUSH_SECONDS)
+            await loop.run_in_executor(self.executor, self._flush_cache)
+
+    async def classify(self, texts: List[str]) -> List[Classification]:
+        """Classify texts as part of the next micro-batch."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, future))
+        return await future
+
+    async def _next_batch(self) -> List[Tuple[List[str], asyncio.Future]]:
+        """Wait for a request, then take whatever else is queued or arrives within max_wait."""
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        size = len(batch[0][0])
+        deadline = loop.time() + self.max_wait
+        while size < self.max_batch:
+            if self.queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self.queue.get_nowait()
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    async def _run_batches(self):
+        """Classify queued requests batch by batch until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            texts = [text for request_texts, _ in batch for text in request_texts]
+            start = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self.executor, self.classify_batch, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.stats['classify_seconds'] += time.perf_counter() - start
+            self.stats['batches'] += 1
+            self.stats['requests'] += len(batch)
+            self.stats['messages'] += len(texts)
+            self.stats['largest_batch'] = max(self.stats['largest_batch'], len(texts))
+            for request_texts, future in batch:
+                if not future.done():
+                    future.set_result([results[text] for text in request_texts])
+
+    def health(self) -> Dict:
+        """Service status: the current rules and the batching counters."""
+        stats = dict(self.stats)
+        stats['classify_seconds'] = round(stats['classify_seconds'], 6)
+        stats['mean_batch'] = (
+            round(stats['messages'] / stats['batches'], 2) if stats['batches'] else None
+        )
+        return {
+            'status': 'ok',
+            'rules': self.store.pack.content_hash[:16] if self.store else None,
+            **stats,
+        }
+
+    async def handle_request(self, method: str, path: str, body: bytes) -> Dict:
+        """Answer one HTTP request with a JSON object; raises RequestError."""
+        if path == '/health':
+            if method != 'GET':
+                raise RequestError(405, 'Use GET /health')
+            return self.health()
+        if path != '/classify':
+            raise RequestError(404, f'No such endpoint: {path}')
+        if method != 'POST':
+            raise RequestError(405, 'Use POST /classify')
+
+        try:
+            payload = json.loads(body)
+        except ValueError as e:
+            raise RequestError(400, f'Body is not valid JSON: {e}')
+        if isinstance(payload, dict) and isinstance(payload.get('message'), str):
+            classifications = await self.classify([payload['message']])
+            return {'classification': _as_dict(classifications[0])}
+        if isinstance(payload, dict) and isinstance(payload.get('messages'), list):
+            texts = payload['messages']
+            if not all(isinstance(text, str) for text in texts):
+                raise RequestError(400, 'messages must be a list of strings')
+            if len(texts) > MAX_MESSAGES:
+                raise RequestError(413, f'At most {MAX_MESSAGES} messages per request')
+            classifications = await self.classify(texts) if texts else []
+            return {'classifications': [_as_dict(c) for c in classifications]}
+        raise RequestError(400, 'Expected {"message": str} or {"messages": [str, ...]}')
+
+    async def handle_connection(self, reader: asyncio.StreamReader,
+                                writer: asyncio.StreamWriter):
+        """Serve HTTP requests on one connection until the client closes it."""
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                except (ConnectionError, ValueError):
+                    break
+                if not request_line.strip():
+                    break
+                keep_alive = True
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                    headers = {}
+                    while True:
+                        line = await reader.readline()
+                        if line in (b'\r\n', b'\n', b''):
+                            break
+                        name, _, value = line.decode('latin-1').partition(':')
+                        headers[name.strip().lower()] = value.strip()
+                    connection = headers.get('connection', '').lower()
+                    keep_alive = connection != 'close' and (
+                        version == 'HTTP/1.1' or connection == 'keep-alive'
+                    )
+                    length = int(headers.get('content-length', 0))
+                    if length > MAX_BODY_BYTES:
+                        keep_alive = False
+                        raise RequestError(413, f'Body larger than {MAX_BODY_BYTES} bytes')
+                    body = await reader.readexactly(length) if length else b''
+                    status, response = 200, await self.handle_request(
+                        method, path.split('?', 1)[0], body
+                    )
+                except RequestError as e:
+                    status, response = e.status, {'error': str(e)}
+                except ValueError:
+                    status, response, keep_alive = 400, {'error': 'Malformed request'}, False
+                except Exception as e:
+                    status, response = 500, {'error': repr(e)}
+
+                data = json.dumps(response).encode('utf-8')
+                writer.write(
+                    f'HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n'
+                    f'Content-Type: application/json\r\n'
+                    f'Content-Length: {len(data)}\r\n'
+                    f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'
+                    .encode('latin-1') + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(service: ClassificationService, host: str = '127.0.0.1',
+                port: int = DEFAULT_PORT, socket_path: str = None, ready=None):
+    """
+    Run the service until cancelled or sent SIGTERM or SIGINT; ready() is
+    called once it accepts connections. The service is stopped, flushing
+    its cache, either way.
+    """
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    signals = []
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(signum, stopping.set)
+            signals.append(signum)
+        except (NotImplementedError, RuntimeError):
+            pass  # No signal handlers on Windows or outside the main thread
+
+    await service.start()
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = await asyncio.start_unix_server(service.handle_connection, socket_path)
+        where = socket_path
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port)
+        where = f'http://{host}:{port}'
+    print(f"Classification service listening on {where}", file=sys.stderr)
+    if ready is not None:
+        ready()
+    try:
+        async with server:
+            await stopping.wait()
+        print("Classification service stopping", file=sys.stderr)
+    finally:
+        await service.stop()
+        for signum in signals:
+            loop.remove_signal_handler(signum)
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve request classification over HTTP")
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help=f'TCP port (default: {DEFAULT_PORT})')
+    parser.add_argument('--socket', default=None, metavar='PATH',
+                        help='Listen on a Unix socket instead of TCP')
+    parser.add_argument('--rules', default=RULES_FILE, metavar='FILE',
+                        help='Rules file, reloaded when it changes (default: the bundled rules.json)')
+    parser.add_argument('--rule-pack-cache', default=None, metavar='DIR',
+                        help='Cache compiled rule packs in DIR')
+    parser.add_argument('--cache', default=None, metavar='PATH',
+                        help='Classification cache shared with the pipeline (SQLite)')
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH,
+                        help=f'Most messages per micro-batch (default: {DEFAULT_MAX_BATCH})')
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help=f'Longest wait for a batch to fill (default: {DEFAULT_MAX_WAIT_MS})')
+    parser.add_argument('--vectorize-from', type=int, default=None, metavar='TEXTS',
+                        help='Classify batches of at least TEXTS distinct messages column-wise')
+    args = parser.parse_args()
+
+    service = ClassificationService(
+        args.rules, args.rule_pack_cache, args.cache,
+        args.max_batch, args.max_wait_ms, args.vectorize_from
+    )
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Request rules compiled for fast first-match-wins classification.
+
+Every rule regex in REQUEST_PATTERNS starts with a literal (or a choice of
+literals) that any match must contain. Those literals are fed to the shared
+KeywordMatcher, so the one keyword scan per message also tells which rules
+can possibly match; only those rules' regexes are run, in priority order.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from keyword_matcher import KeywordHits
+
+_QUANTIFIERS = '?*+{'
+_METACHARACTERS = '\\.^$|?*+()[]{}'
+
+
+def _split_top_level(pattern: str) -> List[str]:
+    """Split a regex on '|' outside groups and character classes."""
+    parts, depth, in_class, escaped, current = [], 0, False, False, []
+    for char in pattern:
+        if escaped:
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            parts.append(''.join(current))
+            current = []
+            continue
+        current.append(char)
+    parts.append(''.join(current))
+    return parts
+
+
+def _leading_literal(branch: str) -> str:
+    """Return the literal text every match of a regex branch starts with."""
+    literal = []
+    for char in branch:
+        if char in _METACHARACTERS:
+            # A quantifier makes the preceding character optional
+            if char in _QUANTIFIERS and literal:
+                literal.pop()
+            break
+        literal.append(char)
+    return ''.join(literal)
+
+
+def required_literals(pattern: re.Pattern) -> Optional[List[str]]:
+    """
+    Return lowercase literals of which every match contains at least one,
+    or None when the pattern has no usable literal prefix.
+    """
+    if pattern.flags & re.VERBOSE:
+        return None
+    literals = [_leading_literal(branch) for branch in _split_top_level(pattern.pattern)]
+    if not all(literal and literal.isascii() for literal in literals):
+        return None
+    return [literal.lower() for literal in literals]
+
+
+def anchored_and_unanchored(patterns: List[re.Pattern]) -> Tuple[re.Pattern, re.Pattern]:
+    """
+    Combine patterns into two regexes: one for the patterns anchored with '^',
+    to be used with match(), and one for the rest, to be used with search().
+    Either matches exactly when one of its patterns would.
+    """
+    anchored, unanchored = [], []
+    for pattern in patterns:
+        flags = ''.join(
+            letter for flag, letter in ((re.IGNORECASE, 'i'), (re.DOTALL, 's'))
+            if pattern.flags & flag
+        )
+        if pattern.flags & (re.MULTILINE | re.VERBOSE):
+            raise ValueError(f'Cannot combine pattern with flags {pattern.flags}: {pattern.pattern}')
+        if pattern.pattern.startswith('^') and len(_split_top_level(pattern.pattern)) == 1:
+            anchored.append(f'(?{flags}:{pattern.pattern[1:]})' if flags else f'(?:{pattern.pattern[1:]})')
+        else:
+            unanchored.append(f'(?{flags}:{pattern.pattern})' if flags else f'(?:{pattern.pattern})')
+    # (?!) never matches, for an empty group
+    return re.compile('|'.join(anchored) or '(?!)'), re.compile('|'.join(unanchored) or '(?!)')
+
+
+class CompiledRequestRules:
+    """
+    REQUEST_PATTERNS in priority order with per-rule literal prefilters.
+
+    match() returns the same (type, category, effort) tuple as searching the
+    rules one by one and taking the first hit.
+    """
+
+    def __init__(self, request_patterns: List[Dict]):
+        self.rules = [
+            (
+                f'rule_{index}',
+                rule['pattern'],
+                (rule['type'], rule['category'], rule['default_effort']),
+                required_literals(rule['pattern']),
+            )
+            for index, rule in enumerate(request_patterns)
+        ]
+
+    def keyword_lists(self) -> Dict[str, List[str]]:
+        """Prefilter literals per rule, tagged for the KeywordMatcher."""
+        return {tag: literals for tag, _, _, literals in self.rules if literals}
+
+    def match(self, text: str, hits: KeywordHits = None) -> Optional[Tuple[str, str, str]]:
+        """
+        Return (type, category, effort) of the first matching rule, or None.
+
+        hits must come from scanning text.lower() with a matcher that includes
+        keyword_lists(). The prefilter is only trusted for ASCII text, where
+        lowercasing and IGNORECASE agree.
+        """
+        use_prefilter = hits is not None and text.isascii()
+        for tag, pattern, result, literals in self.rules:
+            if use_prefilter and literals and not hits.has(tag):
+                continue
+            if pattern.search(text):
+                return result
+        return None
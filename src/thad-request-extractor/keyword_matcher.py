@@ -0,0 +1,98 @@
+"""
+Multi-list keyword matching in a single scan per message.
+
+All keyword lists are merged into one trie, compiled to a regular expression
+so the matching runs inside the regex engine. Each scan reports every
+keyword occurrence tagged with the lists it belongs to, so the extractor can
+answer all of its keyword questions from one pass over the text.
+"""
+
+import re
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """Build a regex that matches the longest word from a trie at each position."""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Greedy optional group: prefer the longer word, fall back to this one
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+class KeywordHits:
+    """Keyword occurrences found in one text."""
+
+    def __init__(self, text: str, hits: List[Tuple[int, int, FrozenSet[str]]], tags: set):
+        self.text = text
+        self.hits = hits
+        self.tags = tags
+
+    def has(self, tag: str) -> bool:
+        """Check for a keyword from the list anywhere in the text."""
+        return tag in self.tags
+
+    def starts_with(self, tag: str) -> bool:
+        """Check whether the stripped text starts with a keyword from the list."""
+        if tag not in self.tags:
+            return False
+        lead = len(self.text) - len(self.text.lstrip())
+        return any(start == lead and tag in tags for start, _, tags in self.hits)
+
+    def has_in_stripped(self, tag: str) -> bool:
+        """Check for a keyword from the list that survives stripping the text."""
+        if tag not in self.tags:
+            return False
+        stripped_end = len(self.text.rstrip())
+        return any(end <= stripped_end and tag in tags for _, end, tags in self.hits)
+
+
+class KeywordMatcher:
+    """Matcher built once from named keyword lists."""
+
+    def __init__(self, keyword_lists: Dict[str, Iterable[str]]):
+        tags: Dict[str, set] = {}
+        for tag, keywords in keyword_lists.items():
+            for keyword in keywords:
+                tags.setdefault(keyword, set()).add(tag)
+
+        self.keywords = sorted(tags)
+        # (?!) never matches, for an empty matcher
+        self._regex = re.compile(trie_pattern(self.keywords) or '(?!)')
+
+        # The regex reports the longest keyword starting at a position; every
+        # keyword that is a prefix of it starts there too.
+        self._prefixes: Dict[str, Tuple[Tuple[int, FrozenSet[str]], ...]] = {
+            keyword: tuple(
+                (len(prefix), frozenset(tags[prefix]))
+                for prefix in self.keywords if keyword.startswith(prefix)
+            )
+            for keyword in self.keywords
+        }
+
+    def scan(self, text: str) -> KeywordHits:
+        """Find every keyword occurrence in text (case-sensitive)."""
+        hits = []
+        found = set()
+        search = self._regex.search
+        position = 0
+        while True:
+            match = search(text, position)
+            if match is None:
+                return KeywordHits(text, hits, found)
+            start = match.start()
+            for length, tags in self._prefixes[match.group()]:
+                hits.append((start, start + length, tags))
+                found |= tags
+            position = start + 1
@@ -6,11 +6,12 @@ import os
 import sys
 from datetime import datetime
 from request_extractor import RequestExtractor
+from request_summary import URGENCY_LEVELS, counts_by, counts_by_month
 
 
 def print_summary(extractor):
     '''Print a summary of extracted requests.'''
-    if not extractor.requests:
+    if extractor.requests.empty:
         print("No requests found!")
         return
         
@@ -20,34 +21,23 @@ def print_summary(extractor):
     
     total = len(extractor.requests)
     print(f"\nTotal Requests Extracted: {total}")
+    cube = extractor.summary_cube()
     
     # Requests by month
     print("\nRequests by Month:")
-    months = {}
-    for req in extractor.requests:
-        month_str = req['month'].strftime('%Y-%m')
-        months[month_str] = months.get(month_str, 0) + 1
-    
-    for month, count in sorted(months.items()):
+    for month, count in counts_by_month(cube).items():
         print(f"  {month}: {count} requests ({count/total*100:.1f}%)")
     
     # Requests by category
     print("\nRequests by Category:")
-    categories = {}
-    for req in extractor.requests:
-        cat = req['category']
-        categories[cat] = categories.get(cat, 0) + 1
-    
-    for cat, count in sorted(categories.items(), key=lambda x: x[1], reverse=True):
+    for cat, count in counts_by(cube, 'category').items():
         print(f"  {cat}: {count} requests ({count/total*100:.1f}%)")
     
     # Urgency distribution
     print("\nUrgency Distribution:")
-    urgency = {'High': 0, 'Medium': 0, 'Low': 0}
-    for req in extractor.requests:
-        urgency[req['urgency']] += 1
-    
-    for level, count in urgency.items():
+    urgency = counts_by(cube, 'urgency')
+    for level in URGENCY_LEVELS:
+        count = urgency.get(level, 0)
         print(f"  {level}: {count} requests ({count/total*100:.1f}%)")
     
     print("\n" + "="*60)
@@ -0,0 +1,161 @@
+"""
+Delta exports: the requests added, changed and removed since the previous
+snapshot.
+
+Every exported request has a stable request_id, its natural key from
+request_table.request_keys (the same value the database loader stores
+as requests.source_key). The delta directory keeps an index of the last
+snapshot, request_id and a hash of the exported row, and each export is
+diffed against it:
+
+    deltas/
+    ├── manifest.json          # Every delta in order, with its counts
+    ├── delta-000001.csv       # op,request_id,<requests_by_month.csv columns>
+    ├── delta-000002.csv
+    └── snapshot_index.csv     # request_id,row_hash of the latest snapshot
+
+op is 'add', 'change' or 'remove'; removed requests carry only their
+request_id. The first delta, with no base_sequence, adds every request.
+Importers remember the last sequence they applied and apply the later
+deltas in order: additions and changes as upserts on request_id,
+removals as deletes. Applying a delta twice is harmless, so a run that
+stops between writing the manifest and the index at worst repeats
+changes in the next delta.
+"""
+
+import csv
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from request_table import request_keys
+
+DELTA_DIR = 'deltas'
+MANIFEST_FILE = 'manifest.json'
+INDEX_FILE = 'snapshot_index.csv'
+DELTA_FORMAT = 1
+
+
+def row_hashes(df_export: pd.DataFrame) -> pd.Series:
+    """Short hashes of exported rows, to tell changed requests from unchanged ones."""
+    values = [df_export[column].astype(str) for column in df_export.columns]
+    return pd.Series([
+        hashlib.sha1('\x1f'.join(row).encode('utf-8')).hexdigest()[:16]
+        for row in zip(*values)
+    ], index=df_export.index, dtype=object)
+
+
+def read_manifest(delta_dir: str) -> Dict:
+    """The delta manifest of delta_dir, empty if there is none yet."""
+    path = os.path.join(delta_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {'format': DELTA_FORMAT, 'deltas': []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def read_delta(path: str, chunk_rows: int = None):
+    """A delta file as strings, like requests_by_month.csv is read back."""
+    return pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_rows)
+
+
+class DeltaWriter:
+    """
+    Diffs an export against the previous snapshot, a frame of exported
+    rows at a time, and writes the delta when finished.
+    """
+
+    def __init__(self, output_dir: str, columns: List[str]):
+        self.delta_dir = os.path.join(output_dir, DELTA_DIR)
+        os.makedirs(self.delta_dir, exist_ok=True)
+        self.columns = columns
+        self.manifest = read_manifest(self.delta_dir)
+        self.sequence = self.manifest['deltas'][-1]['sequence'] + 1 if self.manifest['deltas'] else 1
+        self.base_sequence = self.manifest.get('snapshot_sequence')
+        self.previous = self._read_index() if self.base_sequence is not None else {}
+
+        self.delta_path = os.path.join(self.delta_dir, f'delta-{self.sequence:06d}.csv')
+        self.index_path = os.path.join(self.delta_dir, INDEX_FILE)
+        self._delta_file = open(f'{self.delta_path}.tmp', 'w', newline='', encoding='utf-8')
+        self._index_file = open(f'{self.index_path}.tmp', 'w', newline='', encoding='utf-8')
+        self._delta = csv.writer(self._delta_file)
+        self._index = csv.writer(self._index_file)
+        self._delta.writerow(['op', 'request_id'] + columns)
+        self._index.writerow(['request_id', 'row_hash'])
+        self._seen = {}
+        self.counts = {'additions': 0, 'changes': 0, 'removals': 0, 'total_requests': 0}
+
+    def _read_index(self) -> Dict[str, str]:
+        """request_id -> row_hash of the previous snapshot."""
+        path = os.path.join(self.delta_dir, INDEX_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            return {request_id: row_hash for request_id, row_hash in reader}
+
+    def add(self, df_export: pd.DataFrame):
+        """Diff the next frame of exported rows, in export order."""
+        ids = request_keys(df_export, self._seen)
+        hashes = row_hashes(df_export[self.columns])
+        rows = df_export[self.columns].astype(str).itertuples(index=False, name=None)
+        for request_id, row_hash, row in zip(ids, hashes, rows):
+            previous_hash = self.previous.pop(request_id, None)
+            if previous_hash is None:
+                self._delta.writerow(('add', request_id) + row)
+                self.counts['additions'] += 1
+            elif previous_hash != row_hash:
+                self._delta.writerow(('change', request_id) + row)
+                self.counts['changes'] += 1
+            self._index.writerow((request_id, row_hash))
+        self.counts['total_requests'] += len(ids)
+
+    def abort(self):
+        """
+        Drop the staged delta and index, leaving the previous snapshot
+        current. Safe to call after a failed finish().
+        """
+        for f in (self._delta_file, self._index_file):
+            f.close()
+            if os.path.exists(f.name):
+                os.remove(f.name)
+
+    def finish(self) -> Optional[Dict]:
+        """
+        Write the removals, then the delta, the manifest and the new index.
+        Returns the delta's manifest entry, or None when nothing changed.
+        """
+        for request_id in self.previous:
+            self._delta.writerow(('remove', request_id) + ('',) * len(self.columns))
+        self.counts['removals'] = len(self.previous)
+        self.previous = {}
+        self._delta_file.close()
+        self._index_file.close()
+
+        if not (self.counts['additions'] or self.counts['changes'] or self.counts['removals']):
+            os.remove(self._delta_file.name)
+            os.replace(self._index_file.name, self.index_path)
+            return None
+
+        entry = {
+            'sequence': self.sequence,
+            'file': os.path.basename(self.delta_path),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'base_sequence': self.base_sequence,
+            **self.counts,
+        }
+        os.replace(self._delta_file.name, self.delta_path)
+        self.manifest['deltas'].append(entry)
+        self.manifest['snapshot_sequence'] = self.sequence
+        manifest_path = os.path.join(self.delta_dir, MANIFEST_FILE)
+        with open(f'{manifest_path}.tmp', 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+            f.write('\n')
+        os.replace(f'{manifest_path}.tmp', manifest_path)
+        os.replace(self._index_file.name, self.index_path)
+        return entry
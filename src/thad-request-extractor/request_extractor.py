@@ -2,75 +2,202 @@
 Core module for extracting requests from text messages.
 """
 
+import json
+import os
+import numpy as np
 import pandas as pd
 import re
+import warnings
 from datetime import datetime
-from typing import List, Dict, Tuple
-from request_patterns import REQUEST_PATTERNS, URGENCY_INDICATORS, ACTION_KEYWORDS, WORK_KEYWORDS, EXCLUSION_PATTERNS, NON_REQUEST_PHRASES
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Tuple
+from classification_cache import ClassificationCache, DEFAULT_MAX_ENTRIES, rules_fingerprint
+from keyword_matcher import KeywordHits
+from request_delta import DeltaWriter
+from rule_pack import RulePack, default_rule_pack
+from message_times import minutes_of_day, parse_message_dates, time_columns
+from rule_stats import RuleStats
+from stage_metrics import StageMetrics, measure
+from request_table import (
+    REQUEST_COLUMNS, ParquetMonthWriter, compact_requests, month_labels, parse_month_labels,
+    write_parquet_by_month
+)
+from request_summary import (
+    category_summary, count_cube, merge_cubes, monthly_summary, summary_stats
+)
+from workbook_writer import StreamingWorkbook, write_workbook
+
+# Columns of the cleaned messages the extractor reads, and the sender
+# names the support agent's messages appear under
+MESSAGE_COLUMNS = ['sender', 'message_text', 'message_date']
+SUPPORT_SENDERS = ['Thad Norman', 'Them']
+
+# Rows of the cleaned CSV read and filtered at a time
+READ_CHUNK_ROWS = 100_000
+
+# Columns of requests_by_month.csv and the All Requests sheet
+CSV_COLUMNS = [
+    'date', 'time', 'month', 'request_type', 'category',
+    'description', 'urgency', 'effort'
+]
+
+# More than two whitespace-separated words
+THREE_WORDS_REGEX = re.compile(r'\S\s+\S+\s+\S')
+
+
+def _contains(texts: pd.Series, regex: re.Pattern) -> pd.Series:
+    """Series.str.contains for a compiled regex, which may have groups."""
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', 'This pattern is interpreted as a regular expression')
+        return texts.str.contains(regex)
 
 
 class RequestExtractor:
-    def __init__(self, csv_path: str):
-        """Initialize the extractor with the CSV file path."""
+    def __init__(self, csv_path: str = None, cache_path: str = None,
+                 cache_size: int = DEFAULT_MAX_ENTRIES, metrics: StageMetrics = None,
+                 rule_stats: RuleStats = None, rules: RulePack = None):
+        """
+        Initialize the extractor with the CSV file path.
+
+        When cache_path is given, classifications are cached on disk across
+        runs, keyed by message text and the current rule set. rules is the
+        compiled rule pack to classify with, the bundled rules.json by
+        default (see rule_pack.py). When metrics
+        is given, loading, classification and every export step are timed
+        as stages of it, and classification is profiled. When rule_stats is
+        given, every rule and keyword check of classification is counted
+        and timed in it (see rule_stats.py).
+        """
         self.csv_path = csv_path
         self.df = None
-        self.requests = []
+        # Extracted requests in the compact layout of request_table.py
+        self.requests = compact_requests(pd.DataFrame(columns=REQUEST_COLUMNS))
+        self.rules = rules or default_rule_pack()
+        self.cache_size = cache_size
+        self.cache = self._open_cache(cache_path)
+        self.metrics = metrics
+        self.rule_stats = rule_stats
+
+    def _open_cache(self, cache_path: str):
+        """The classification cache for the current rules, if caching is on."""
+        if not cache_path:
+            return None
+        return ClassificationCache(cache_path, self.cache_size, rules_fingerprint(self.rules))
+
+    def use_rules(self, rules: RulePack):
+        """
+        Classify with another rule pack from now on, e.g. one swapped in by a
+        RulePackStore between batches. The classification cache switches to
+        the new rules' entries.
+        """
+        if rules is self.rules:
+            return
+        self.rules = rules
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = self._open_cache(self.cache.path)
         
     def load_data(self):
-        """Load the CSV file into a pandas DataFrame."""
-        self.df = pd.read_csv(self.csv_path)
-        # Filter for support agent messages (handle multiple sender formats)
-        self.df = self.df[
-            ((self.df['sender'] == 'Thad Norman') | (self.df['sender'] == 'Them')) &
-            (self.df['message_text'].notna())
-        ].copy()
-        
-        # Convert message_date to datetime (treating as UTC and converting to EDT)
-        self.df['datetime'] = pd.to_datetime(self.df['message_date'], utc=True)
-        # Convert UTC to EDT (UTC-4) - America/New_York handles EDT/EST automatically
-        self.df['datetime'] = self.df['datetime'].dt.tz_convert('America/New_York')
-        self.df['date'] = self.df['datetime'].dt.date
-        # Format time as 12-hour format string (e.g., "8:47 AM" instead of time object)
-        self.df['time'] = self.df['datetime'].dt.strftime('%I:%M %p').str.lstrip('0')
-        self.df['month'] = self.df['datetime'].dt.to_period('M')
-        
+        """
+        Load the support agent messages of the CSV file into a DataFrame.
+
+        Only the columns the extractor uses are read, with sender as a
+        categorical, and each chunk is filtered down to support agent
+        messages as it is read.
+        """
+        self.load_batches(self.read_batches())
+
+    def read_batches(self, chunk_rows: int = READ_CHUNK_ROWS) -> Iterable[pd.DataFrame]:
+        """Read the columns the extractor uses from the CSV file, chunk_rows rows at a time."""
+        return pd.read_csv(
+            self.csv_path,
+            usecols=MESSAGE_COLUMNS,
+            dtype={'sender': 'category', 'message_text': str},
+            chunksize=chunk_rows
+        )
+
+    def load_dataframe(self, df: pd.DataFrame):
+        """Load cleaned messages from an in-memory DataFrame."""
+        self.load_batches([df])
+
+    def load_batches(self, batches: Iterable[pd.DataFrame]):
+        """
+        Load cleaned messages from an iterable of DataFrames, e.g. chunks
+        streamed from the cleaner, keeping only support agent messages of
+        each batch as it arrives.
+        """
+        with measure(self.metrics, 'load') as stage:
+            stage['rows_in'] = 0
+            frames = []
+            for batch in batches:
+                stage['rows_in'] += len(batch)
+                frames.append(self._select_support_messages(batch))
+            self.df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+                columns=MESSAGE_COLUMNS
+            )
+            self._add_time_columns()
+            stage['rows_out'] = len(self.df)
         print(f"Loaded {len(self.df)} support agent messages")
+
+    def _select_support_messages(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Filter for support agent messages (handle multiple sender formats)."""
+        return df.loc[
+            (df['sender'].isin(SUPPORT_SENDERS)) &
+            (df['message_text'].notna()) & (df['message_text'] != ''),
+            MESSAGE_COLUMNS
+        ].copy()
+
+    def _add_time_columns(self):
+        """Derive datetime, date, time and month columns from message_date."""
+        # message_date is UTC; the derived columns are in America/New_York
+        # (EDT/EST), with time as a 12-hour label (e.g. "8:47 AM")
+        with measure(self.metrics, 'parse_dates', len(self.df)) as stage:
+            datetimes = parse_message_dates(self.df['message_date'])
+            undated = datetimes.isna()
+            if undated.any():
+                print(f"Skipping {undated.sum()} messages without a message_date")
+                self.df, datetimes = self.df[~undated].copy(), datetimes[~undated]
+            times = time_columns(datetimes)
+            for column in times.columns:
+                self.df[column] = times[column]
+            stage['rows_out'] = len(self.df)
         
-    def extract_urgency(self, text: str) -> str:
+    def scan_keywords(self, text: str) -> KeywordHits:
+        """Find all keyword list hits in a message with one scan."""
+        return self.rules.keyword_matcher.scan(text.lower())
+
+    def extract_urgency(self, text: str, hits: KeywordHits = None) -> str:
         """Determine urgency level from message text."""
-        text_lower = text.lower()
+        if hits is None:
+            hits = self.scan_keywords(text)
         
-        for indicator in URGENCY_INDICATORS['high']:
-            if indicator in text_lower:
-                return 'High'
+        if hits.has('urgency_high'):
+            return 'High'
                 
-        for indicator in URGENCY_INDICATORS['low']:
-            if indicator in text_lower:
-                return 'Low'
+        if hits.has('urgency_low'):
+            return 'Low'
                 
         return 'Medium'
     
-    def is_excluded_message(self, text: str) -> bool:
+    def is_excluded_message(self, text: str, hits: KeywordHits = None) -> bool:
         """Check if message should be excluded (conversational, not a request)."""
         text_lower = text.lower().strip()
+        if hits is None:
+            hits = self.scan_keywords(text)
         
-        # Exclude iMessage reactions - these should never be considered requests
-        if any(phrase in text for phrase in ['Emphasized "', 'Liked "', 'Disliked "']):
-            return True
-        
-        # Also check for these patterns anywhere in the text (broader catch)
-        if any(keyword in text_lower for keyword in ['emphasized ', 'liked ', 'disliked ']):
+        # Exclude iMessage reactions - these should never be considered requests.
+        # Checked on the lowercased text, which also covers 'Liked "' etc.
+        if hits.has_in_stripped('reaction'):
             return True
         
         # Check exclusion patterns
-        for pattern in EXCLUSION_PATTERNS:
+        for pattern in self.rules.exclusion_patterns:
             if pattern.search(text):
                 return True
         
         # Check for standalone conversational phrases
-        for phrase in NON_REQUEST_PHRASES:
-            if text_lower.startswith(phrase.lower()):
-                return True
+        if hits.starts_with('non_request'):
+            return True
         
         # Exclude very short messages (likely conversational)
         if len(text_lower.split()) <= 2 and text_lower not in ['please help', 'need help']:
@@ -78,160 +205,494 @@ class RequestExtractor:
             
         return False
     
-    def is_work_related(self, text: str) -> bool:
+    def is_work_related(self, text: str, hits: KeywordHits = None) -> bool:
         """Check if message contains work-related content."""
-        text_lower = text.lower()
+        if hits is None:
+            hits = self.scan_keywords(text)
         
         # First check if it should be excluded
-        if self.is_excluded_message(text):
+        if self.is_excluded_message(text, hits):
             return False
         
-        # Check for work keywords
-        has_work_keyword = any(keyword in text_lower for keyword in WORK_KEYWORDS)
-        # Check for action keywords
-        has_action_keyword = any(keyword in text_lower for keyword in ACTION_KEYWORDS)
-        
-        return has_work_keyword and has_action_keyword
+        # Check for work and action keywords
+        return hits.has('work') and hits.has('action')
     
-    def extract_request_type(self, text: str) -> Tuple[str, str, str]:
+    def extract_request_type(self, text: str, hits: KeywordHits = None) -> Tuple[str, str, str]:
         """Extract request type, category, and effort from text."""
+        if hits is None:
+            hits = self.scan_keywords(text)
+
         # Check exclusions FIRST (conservative filtering)
-        if self.is_excluded_message(text):
+        if self.is_excluded_message(text, hits):
             return (None, None, None)
             
-        # Check specific patterns
-        for pattern_info in REQUEST_PATTERNS:
-            if pattern_info['pattern'].search(text):
-                return (
-                    pattern_info['type'],
-                    pattern_info['category'],
-                    pattern_info['default_effort']
-                )
+        # Check specific patterns (first match wins)
+        request = self.rules.request_rules.match(text, hits)
+        if request:
+            return request
         
-        # If no specific pattern matches but is work-related
-        if self.is_work_related(text):
+        # If no specific pattern matches but is work-related (exclusions
+        # were already checked above)
+        if hits.has('work') and hits.has('action'):
             return ('General Request', 'Support', 'Medium')
             
         return (None, None, None)
+
+    def classify_message(self, text: str) -> Tuple[str, str, str, str]:
+        """
+        Return (request_type, category, effort, urgency) for a message, going
+        through the classification cache when one is configured. Urgency is
+        only computed for requests.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(text)
+            if cached is not None:
+                return cached
+
+        hits = self.scan_keywords(text)
+        request_type, category, effort = self.extract_request_type(text, hits)
+        urgency = self.extract_urgency(text, hits) if request_type else None
+        classification = (request_type, category, effort, urgency)
+
+        if self.cache is not None:
+            self.cache.put(text, classification)
+        return classification
     
+    def classify_series(self, texts: pd.Series) -> pd.DataFrame:
+        """
+        Classify a column of messages at once.
+
+        Returns a DataFrame aligned with texts holding request_type, category,
+        effort and urgency, the same values classify_message gives for each
+        message. Missing texts are classified like "", as not requests. Each
+        distinct text is classified once, and cached texts are not
+        classified again.
+        """
+        columns = ['request_type', 'category', 'effort', 'urgency']
+        texts = texts.fillna('')
+        unique_texts = pd.Series(pd.unique(texts), dtype=object)
+
+        cached = {}
+        if self.cache is not None:
+            for text in unique_texts:
+                entry = self.cache.get(text)
+                if entry is not None:
+                    cached[text] = entry
+        pending = unique_texts[~unique_texts.isin(list(cached))] if cached else unique_texts
+
+        classified = self._classify_columns(pending)
+        if self.cache is not None:
+            for text, classification in zip(pending, classified.itertuples(index=False, name=None)):
+                self.cache.put(text, classification)
+        if cached:
+            classified = pd.concat([
+                classified,
+                pd.DataFrame(list(cached.values()), columns=columns, index=list(cached.keys()))
+            ])
+
+        positions = pd.Index(classified.index).get_indexer(texts)
+        result = classified.iloc[positions]
+        result.index = texts.index
+        return result
+
+    def _check(self, kind: str, name: str, values: pd.Series,
+               check: Callable[[pd.Series], pd.Series], pattern: str = None) -> pd.Series:
+        """check(values), counted and timed in the rule stats when enabled."""
+        if self.rule_stats is None:
+            return check(values)
+        return self.rule_stats.check(kind, name, values, check, pattern)
+
+    def _classify_columns(self, texts: pd.Series) -> pd.DataFrame:
+        """Classify distinct message texts with one regex pass per check."""
+        # One pack for the whole pass, even if use_rules() swaps it meanwhile
+        rules, stats = self.rules, self.rule_stats
+        texts = texts.reset_index(drop=True)
+        lower = texts.str.lower()
+        stripped = lower.str.strip()
+        if stats is not None:
+            stats.texts += len(texts)
+
+        # Same order of checks as is_excluded_message. With rule stats the
+        # exclusion patterns are checked one by one, so each can be counted
+        if stats is None:
+            exclusion_checks = [
+                ('exclusion', 'anchored', texts, lambda values: values.str.match(rules.anchored_exclusions), None),
+                ('exclusion', 'unanchored', texts, partial(_contains, regex=rules.unanchored_exclusions), None),
+            ]
+        else:
+            exclusion_checks = [
+                ('exclusion', str(index), texts, partial(_contains, regex=pattern), pattern.pattern)
+                for index, pattern in enumerate(rules.exclusion_patterns)
+            ]
+        checks = [
+            ('keyword', 'reaction', stripped, lambda values: values.str.contains(rules.reaction_regex), None),
+            *exclusion_checks,
+            ('keyword', 'non_request', stripped,
+             lambda values: values.str.startswith(rules.non_request_prefixes), None),
+            ('keyword', 'two_words_or_fewer', stripped,
+             lambda values: ~values.str.contains(THREE_WORDS_REGEX)
+             & ~values.isin(['please help', 'need help']), None),
+        ]
+        excluded = pd.Series(False, index=texts.index)
+        for kind, name, values, check, pattern in checks:
+            matched = self._check(kind, name, values, check, pattern)
+            if stats is not None:
+                stats.decided(kind, name, (matched & ~excluded).sum())
+            excluded |= matched
+
+        # Rule masks are only needed for messages that are not excluded
+        candidates = texts[~excluded]
+        candidate_lower = lower[~excluded]
+        conditions = [
+            self._check('request', f"{index}: {rule['type']}", candidates,
+                        partial(_contains, regex=rule['pattern']), rule['pattern'].pattern)
+            for index, rule in enumerate(rules.request_patterns)
+        ]
+        conditions.append(
+            self._check('keyword', 'work', candidate_lower,
+                        lambda values: values.str.contains(rules.work_regex))
+            & self._check('keyword', 'action', candidate_lower,
+                          lambda values: values.str.contains(rules.action_regex))
+        )
+        results = [
+            (rule['type'], rule['category'], rule['default_effort']) for rule in rules.request_patterns
+        ] + [('General Request', 'Support', 'Medium'), (None, None, None)]
+
+        # First matching condition wins; the last entry of results is no match
+        choice = np.full(len(texts), len(results) - 1)
+        if len(candidates):
+            choice[~excluded.to_numpy()] = np.select(
+                [condition.to_numpy() for condition in conditions],
+                range(len(conditions)),
+                default=len(results) - 1
+            )
+        if stats is not None:
+            decided = np.bincount(choice[~excluded.to_numpy()], minlength=len(results))
+            for index, rule in enumerate(rules.request_patterns):
+                stats.decided('request', f"{index}: {rule['type']}", decided[index])
+            # Requests that no rule matched but the work and action keywords did
+            stats.decided('request', 'keyword fallback', decided[len(rules.request_patterns)])
+        lookup = np.array(results, dtype=object)
+        classified = pd.DataFrame(
+            lookup[choice], columns=['request_type', 'category', 'effort']
+        )
+
+        is_request = classified['request_type'].notna().to_numpy()
+        request_lower = lower[is_request]
+        high = self._check('keyword', 'urgency_high', request_lower,
+                           lambda values: values.str.contains(rules.urgency_high_regex)).to_numpy()
+        low = self._check('keyword', 'urgency_low', request_lower,
+                          lambda values: values.str.contains(rules.urgency_low_regex)).to_numpy()
+        if stats is not None:
+            stats.decided('keyword', 'urgency_high', high.sum())
+            stats.decided('keyword', 'urgency_low', (low & ~high).sum())
+        urgency = np.full(len(texts), None, dtype=object)
+        urgency[is_request] = np.select([high, low], ['High', 'Low'], default='Medium')
+        classified['urgency'] = urgency
+        classified.index = texts
+        return classified
+
     def process_messages(self):
-        """Process all messages and extract requests."""
-        for idx, row in self.df.iterrows():
-            text = row['message_text']
-            
-            # Extract request information
-            request_type, category, effort = self.extract_request_type(text)
-            
-            if request_type:
-                urgency = self.extract_urgency(text)
-                
-                # Clean description (no truncation)
-                description = re.sub(r'\s+', ' ', text).strip()
-                
-                request = {
-                    'datetime': row['datetime'],
-                    'date': row['date'],
-                    'time': row['time'],
-                    'month': row['month'],
-                    'request_type': request_type,
-                    'category': category,
-                    'description': description,
-                    'urgency': urgency,
-                    'effort': effort,
-                    'full_text': text,
-                    'message_length': len(text)
-                }
-                
-                self.requests.append(request)
-        
+        """Process all messages and extract requests into self.requests."""
+        self.requests = self._extract_requests()
         print(f"Extracted {len(self.requests)} requests")
+
+        if self.cache is not None:
+            self.cache.flush()
+            print(f"Classification cache: {self.cache.hits} hits, {self.cache.misses} misses")
+
+    def _extract_requests(self) -> pd.DataFrame:
+        """The requests among the loaded messages, in the compact layout."""
+        with measure(self.metrics, 'classify', len(self.df), profile=True) as stage:
+            classified = self.classify_series(self.df['message_text'])
+            is_request = classified['request_type'].notna()
+            stage['rows_out'] = int(is_request.sum())
+
+        with measure(self.metrics, 'build_requests', stage['rows_out']) as stage:
+            requests = self._request_rows(self.df[is_request], classified[is_request])
+            stage['rows_out'] = len(requests)
+        return requests
+
+    def _request_rows(self, messages: pd.DataFrame, classified: pd.DataFrame) -> pd.DataFrame:
+        """Compact request rows for the request messages and their classifications."""
+        texts = messages['message_text']
+        return compact_requests(pd.DataFrame({
+            'datetime': messages['datetime'],
+            'date': messages['date'],
+            'time': messages['time'],
+            'month': messages['month'],
+            'request_type': classified['request_type'],
+            'category': classified['category'],
+            # Clean description (no truncation)
+            'description': texts.str.replace(r'\s+', ' ', regex=True).str.strip(),
+            'urgency': classified['urgency'],
+            'effort': classified['effort'],
+            'full_text': texts,
+            'message_length': texts.str.len(),
+        })).reset_index(drop=True)
+
+    def summary_cube(self, df_requests: pd.DataFrame = None) -> pd.Series:
+        """Request counts by month, category, urgency and effort (see request_summary.py)."""
+        if df_requests is None:
+            df_requests = self.requests
+        with measure(self.metrics, 'summary_cube', len(df_requests)) as stage:
+            cube = count_cube(df_requests)
+            stage['rows_out'] = len(cube)
+        return cube
+
+    def create_monthly_summary(self, df_requests: pd.DataFrame = None,
+                               cube: pd.Series = None) -> pd.DataFrame:
+        """Create a summary of requests by month, from cube if one is given."""
+        if cube is None:
+            cube = self.summary_cube(df_requests)
         
-    def create_monthly_summary(self) -> pd.DataFrame:
-        """Create a summary of requests by month."""
-        df_requests = pd.DataFrame(self.requests)
-        
-        if df_requests.empty:
+        if cube.empty:
             return pd.DataFrame()
-            
-        monthly_summary = df_requests.groupby(['month', 'category']).agg({
-            'request_type': 'count',
-            'urgency': lambda x: (x == 'High').sum(),
-            'effort': lambda x: {
-                'Small': (x == 'Small').sum(),
-                'Medium': (x == 'Medium').sum(),
-                'Large': (x == 'Large').sum()
-            }
-        }).rename(columns={
-            'request_type': 'total_requests',
-            'urgency': 'high_urgency_count'
-        })
-        
-        return monthly_summary
-    
-    def export_results(self, output_dir: str = 'output'):
-        """Export results to various formats."""
-        if not self.requests:
+
+        return monthly_summary(cube)
+
+    def create_category_summary(self, df_requests: pd.DataFrame = None,
+                                cube: pd.Series = None) -> pd.DataFrame:
+        """Create a summary of requests by category, from cube if one is given."""
+        if cube is None:
+            cube = self.summary_cube(df_requests)
+        return category_summary(cube)
+
+    def load_previous_requests(self, csv_path: str) -> pd.DataFrame:
+        """Load a previously exported requests_by_month.csv for merging."""
+        df_previous = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+        df_previous['date'] = pd.to_datetime(df_previous['date']).dt.date
+        df_previous['month'] = parse_month_labels(df_previous['month'])
+        return df_previous
+
+    def write_workbook(self, df_export: pd.DataFrame, cube: pd.Series, path: str):
+        """
+        Write the Excel workbook: all requests as exported to CSV, plus the
+        monthly and category summaries from the summary cube.
+        """
+        with measure(self.metrics, 'export_xlsx', len(df_export)) as stage:
+            write_workbook(path, [('All Requests', df_export, False)] + self._summary_sheets(cube))
+            stage['rows_out'] = len(df_export)
+        print(f"Exported Excel to {path}")
+
+    def _summary_sheets(self, cube: pd.Series) -> List[Tuple[str, pd.DataFrame, bool]]:
+        """The (title, frame, index) summary sheets of the workbook."""
+        sheets = []
+        monthly_summary = self.create_monthly_summary(cube=cube)
+        if not monthly_summary.empty:
+            sheets.append(('Monthly Summary', monthly_summary, True))
+        sheets.append(('Category Summary', self.create_category_summary(cube=cube), True))
+        return sheets
+
+    def _write_summary_json(self, output_dir: str, cube: pd.Series, start, end):
+        """Export summary statistics to requests_summary.json."""
+        with measure(self.metrics, 'export_json'), \
+                open(f'{output_dir}/requests_summary.json', 'w') as f:
+            json.dump(summary_stats(cube, start, end), f, indent=2, default=str)
+        print(f"Exported JSON summary to {output_dir}/requests_summary.json")
+
+    def _report_delta(self, entry: Dict):
+        """Print the outcome of a delta export."""
+        if entry is None:
+            print("No requests changed since the previous snapshot")
+            return
+        print(f"Exported delta {entry['file']}: {entry['additions']} added, "
+              f"{entry['changes']} changed, {entry['removals']} removed")
+
+    def export_workbook(self, output_dir: str = 'output'):
+        """
+        Build requests_detailed.xlsx from the requests_by_month.csv already in
+        output_dir, for exports that were run with excel=False.
+        """
+        df_requests = compact_requests(self.load_previous_requests(f'{output_dir}/requests_by_month.csv'))
+        df_export = df_requests[CSV_COLUMNS].assign(month=month_labels(df_requests['month']))
+        self.write_workbook(df_export, self.summary_cube(df_requests), f'{output_dir}/requests_detailed.xlsx')
+
+    def export_results(self, output_dir: str = 'output', merge: bool = False,
+                       parquet: bool = False, excel: bool = True, delta: bool = False):
+        """
+        Export results to various formats.
+
+        With merge=True the new requests are merged into the ones already in
+        output_dir/requests_by_month.csv, in date and time order, and all
+        outputs are rewritten from the combined set. With parquet=True the requests are also written as
+        a month-partitioned Parquet dataset in output_dir/requests_parquet
+        (requires pyarrow); not with merge=True, as the merged requests
+        have no datetime or full_text. With delta=True the requests added, changed and
+        removed since the previous export are written to output_dir/deltas
+        (see request_delta.py). The Excel workbook is written last, after
+        the CSV and JSON; with excel=False it is skipped and can be built
+        later with export_workbook.
+        """
+        if merge and parquet:
+            raise ValueError("Parquet export cannot be combined with merging: the merged "
+                             "requests have no datetime or full_text")
+        if self.requests.empty:
             print("No requests to export")
             return
             
-        df_requests = pd.DataFrame(self.requests)
-        
-        # Sort by datetime
-        df_requests = df_requests.sort_values('datetime')
+        df_requests = self.requests
         
-        # Convert month to string for JSON compatibility
-        df_requests['month_str'] = df_requests['month'].astype(str)
+        # Sort by datetime, keeping message order for ties so merged and full
+        # exports line up
+        df_requests = df_requests.sort_values('datetime', kind='stable')
 
-        # Export detailed requests to CSV
-        csv_columns = [
-            'date', 'time', 'month', 'request_type', 'category',
-            'description', 'urgency', 'effort'
-        ]
-        df_requests[csv_columns].to_csv(
-            f'{output_dir}/requests_by_month.csv',
-            index=False
-        )
-        print(f"Exported CSV to {output_dir}/requests_by_month.csv")
+        previous_csv = f'{output_dir}/requests_by_month.csv'
+        if merge and os.path.exists(previous_csv):
+            with measure(self.metrics, 'merge', len(df_requests)) as stage:
+                df_previous = self.load_previous_requests(previous_csv)
+                # The new requests may predate the earlier ones (an older
+                # export read later), so the merged set is sorted again, by
+                # the minute the CSV keeps
+                df_requests = pd.concat([df_previous, df_requests], ignore_index=True).sort_values(
+                    ['date', 'time'], kind='stable',
+                    key=lambda column: minutes_of_day(column) if column.name == 'time' else column
+                )
+                df_requests = compact_requests(df_requests.reset_index(drop=True))
+                stage['rows_out'] = len(df_requests)
+            print(f"Merged {len(self.requests)} new requests into {len(df_previous)} existing")
         
-        # Export to Excel with multiple sheets
-        with pd.ExcelWriter(f'{output_dir}/requests_detailed.xlsx') as writer:
-            # All requests
-            df_requests[csv_columns].to_excel(
-                writer, sheet_name='All Requests', index=False
+        # Export detailed requests to CSV, with 'YYYY-MM' month labels
+        with measure(self.metrics, 'export_csv', len(df_requests)) as stage:
+            df_export = df_requests[CSV_COLUMNS].assign(month=month_labels(df_requests['month']))
+            df_export.to_csv(
+                f'{output_dir}/requests_by_month.csv',
+                index=False
             )
-            
-            # Monthly summary
-            monthly_summary = self.create_monthly_summary()
-            if not monthly_summary.empty:
-                monthly_summary.to_excel(writer, sheet_name='Monthly Summary')
-            
-            # Category summary
-            category_summary = df_requests.groupby('category').agg({
-                'request_type': 'count',
-                'urgency': lambda x: {
-                    'High': (x == 'High').sum(),
-                    'Medium': (x == 'Medium').sum(),
-                    'Low': (x == 'Low').sum()
-                }
-            }).rename(columns={'request_type': 'total_count'})
-            category_summary.to_excel(writer, sheet_name='Category Summary')
-            
-        print(f"Exported Excel to {output_dir}/requests_detailed.xlsx")
+            stage['rows_out'] = len(df_export)
+        print(f"Exported CSV to {output_dir}/requests_by_month.csv")
+
+        if delta:
+            with measure(self.metrics, 'export_delta', len(df_export)) as stage:
+                delta_writer = DeltaWriter(output_dir, CSV_COLUMNS)
+                try:
+                    delta_writer.add(df_export)
+                    entry = delta_writer.finish()
+                except Exception:
+                    delta_writer.abort()
+                    raise
+                stage['rows_out'] = (
+                    entry['additions'] + entry['changes'] + entry['removals'] if entry else 0
+                )
+            self._report_delta(entry)
+
+        if parquet:
+            with measure(self.metrics, 'export_parquet', len(df_requests)) as stage:
+                write_parquet_by_month(df_requests, f'{output_dir}/requests_parquet')
+                stage['rows_out'] = len(df_requests)
+            print(f"Exported Parquet dataset to {output_dir}/requests_parquet")
         
+        # Every summary below is derived from one count cube
+        cube = self.summary_cube(df_requests)
+
         # Export summary statistics to JSON
-        summary_stats = {
-            'total_requests': len(self.requests),
-            'date_range': {
-                'start': str(df_requests['date'].min()),
-                'end': str(df_requests['date'].max())
-            },
-            'by_month': df_requests.groupby('month_str')['request_type'].count().to_dict(),
-            'by_category': df_requests['category'].value_counts().to_dict(),
-            'by_urgency': df_requests['urgency'].value_counts().to_dict(),
-            'by_effort': df_requests['effort'].value_counts().to_dict()
-        }
-        
-        import json
-        with open(f'{output_dir}/requests_summary.json', 'w') as f:
-            json.dump(summary_stats, f, indent=2, default=str)
-        print(f"Exported JSON summary to {output_dir}/requests_summary.json")
\ No newline at end of file
+        self._write_summary_json(output_dir, cube, df_requests['date'].min(), df_requests['date'].max())
+
+        # Export to Excel with multiple sheets
+        if excel:
+            self.write_workbook(df_export, cube, f'{output_dir}/requests_detailed.xlsx')
+
+    def export_chunked(self, batches: Iterable[pd.DataFrame], output_dir: str = 'output',
+                       parquet: bool = False, excel: bool = True, delta: bool = False) -> int:
+        """
+        Extract and export requests one batch of cleaned messages at a time,
+        for histories too large to hold in memory.
+
+        Each batch is classified and its requests appended to the CSV, and
+        to the Parquet dataset, All Requests sheet and delta when enabled.
+        Apart from the delta's index of the previous snapshot, only the
+        summary cube and the date range are kept across batches, so memory
+        is bounded by the batch size. Requests are written in input order,
+        sorted by datetime within each batch: the same as export_results
+        when the input is in date order. Outputs are written next to their
+        final paths and moved into place at the end.
+
+        Returns the number of requests exported.
+        """
+        csv_path = f'{output_dir}/requests_by_month.csv'
+        csv_staging = f'{csv_path}.tmp'
+        parquet_writer = workbook = delta_writer = None
+        cubes, start, end, last_datetime = [], None, None, None
+        total, in_order = 0, True
+
+        # A failure before the delta is finished drops it, so the next
+        # export still diffs against the last snapshot
+        try:
+            for batch in batches:
+                with measure(self.metrics, 'load', len(batch)) as stage:
+                    self.df = self._select_support_messages(batch)
+                    self._add_time_columns()
+                    stage['rows_out'] = len(self.df)
+                df_requests = self._extract_requests().sort_values('datetime', kind='stable')
+                self.df = None
+                if df_requests.empty:
+                    continue
+
+                if in_order and last_datetime is not None and df_requests['datetime'].iloc[0] < last_datetime:
+                    print("Input is not in date order; requests are exported in input order")
+                    in_order = False
+                last_datetime = df_requests['datetime'].iloc[-1]
+
+                with measure(self.metrics, 'export_csv', len(df_requests)) as stage:
+                    df_export = df_requests[CSV_COLUMNS].assign(month=month_labels(df_requests['month']))
+                    df_export.to_csv(csv_staging, mode='w' if total == 0 else 'a',
+                                     header=total == 0, index=False)
+                    stage['rows_out'] = len(df_export)
+                if delta:
+                    with measure(self.metrics, 'export_delta', len(df_export)):
+                        if delta_writer is None:
+                            delta_writer = DeltaWriter(output_dir, CSV_COLUMNS)
+                        delta_writer.add(df_export)
+                if parquet:
+                    with measure(self.metrics, 'export_parquet', len(df_requests)) as stage:
+                        if parquet_writer is None:
+                            parquet_writer = ParquetMonthWriter(f'{output_dir}/requests_parquet')
+                        parquet_writer.write(df_requests)
+                        stage['rows_out'] = len(df_requests)
+                if excel:
+                    with measure(self.metrics, 'export_xlsx', len(df_export)) as stage:
+                        if workbook is None:
+                            workbook = StreamingWorkbook(
+                                f'{output_dir}/requests_detailed.xlsx', 'All Requests', CSV_COLUMNS
+                            )
+                        workbook.append(df_export)
+                        stage['rows_out'] = len(df_export)
+
+                cubes = [merge_cubes(cubes + [self.summary_cube(df_requests)])]
+                batch_start, batch_end = df_requests['date'].min(), df_requests['date'].max()
+                start = batch_start if start is None else min(start, batch_start)
+                end = batch_end if end is None else max(end, batch_end)
+                total += len(df_requests)
+                print(f"Extracted {total} requests so far")
+
+            if self.cache is not None:
+                self.cache.flush()
+                print(f"Classification cache: {self.cache.hits} hits, {self.cache.misses} misses")
+
+            if total == 0:
+                print("No requests to export")
+                return 0
+
+            os.replace(csv_staging, csv_path)
+            print(f"Exported CSV to {csv_path}")
+            if delta_writer is not None:
+                with measure(self.metrics, 'export_delta'):
+                    entry = delta_writer.finish()
+        except Exception:
+            if delta_writer is not None:
+                delta_writer.abort()
+            raise
+        if delta_writer is not None:
+            self._report_delta(entry)
+        if parquet_writer is not None:
+            with measure(self.metrics, 'export_parquet'):
+                parquet_writer.close()
+            print(f"Exported Parquet dataset to {output_dir}/requests_parquet")
+
+        cube = cubes[0]
+        self._write_summary_json(output_dir, cube, start, end)
+        if workbook is not None:
+            with measure(self.metrics, 'export_xlsx'):
+                workbook.finish(self._summary_sheets(cube))
+            print(f"Exported Excel to {output_dir}/requests_detailed.xlsx")
+        return total
@@ -0,0 +1,99 @@
+"""
+Request summaries derived from one aggregation cube.
+
+The cube counts requests by month, category, urgency and effort in a
+single groupby over the compact requests frame. The monthly and category
+sheets, the JSON statistics and the printed summary are all sums over
+its cells, so none of them scans the requests again. Cubes of separate
+chunks add up, so a chunked export only has to keep the running cube.
+"""
+
+from typing import Dict, List
+
+import pandas as pd
+
+from request_table import month_labels
+
+CUBE_DIMENSIONS = ['month', 'category', 'urgency', 'effort']
+
+URGENCY_LEVELS = ['High', 'Medium', 'Low']
+EFFORT_LEVELS = ['Small', 'Medium', 'Large']
+
+
+def count_cube(df_requests: pd.DataFrame) -> pd.Series:
+    """
+    Request counts indexed by ('YYYY-MM' month, category, urgency, effort).
+
+    Only combinations that occur are kept. Missing urgency or effort
+    values form their own cells, so totals still count those requests.
+    """
+    dimensions = df_requests[CUBE_DIMENSIONS].assign(month=month_labels(df_requests['month']))
+    return dimensions.groupby(CUBE_DIMENSIONS, observed=True, dropna=False).size()
+
+
+def merge_cubes(cubes: List[pd.Series]) -> pd.Series:
+    """Add up cubes of separate sets of requests, e.g. chunks of one export."""
+    merged = pd.concat(cubes)
+    return merged.groupby(level=CUBE_DIMENSIONS, observed=True, dropna=False).sum().astype('int64')
+
+
+def _totals(cube: pd.Series, levels: List[str]) -> pd.Series:
+    """Cube counts summed down to the given levels."""
+    return cube.groupby(level=levels, observed=True).sum()
+
+
+def _level_counts(cube: pd.Series, levels: List[str], dimension: str, values: List[str]) -> pd.DataFrame:
+    """Counts per levels group with one column per value of dimension, zero filled."""
+    counts = _totals(cube, levels + [dimension]).unstack(dimension, fill_value=0)
+    return counts.reindex(columns=values, fill_value=0)
+
+
+def _count_dicts(counts: pd.DataFrame) -> List[Dict[str, int]]:
+    """One {value: count} dict per row, as the summary sheets show them."""
+    return [dict(zip(counts.columns, row)) for row in counts.itertuples(index=False, name=None)]
+
+
+def monthly_summary(cube: pd.Series) -> pd.DataFrame:
+    """Requests, high urgency count and effort breakdown by month and category."""
+    levels = ['month', 'category']
+    summary = _totals(cube, levels).to_frame('total_requests')
+    summary['high_urgency_count'] = _level_counts(cube, levels, 'urgency', ['High'])['High']
+    summary['effort'] = _count_dicts(
+        _level_counts(cube, levels, 'effort', EFFORT_LEVELS).reindex(summary.index)
+    )
+    return summary
+
+
+def category_summary(cube: pd.Series) -> pd.DataFrame:
+    """Requests and urgency breakdown by category."""
+    summary = _totals(cube, ['category']).to_frame('total_count')
+    summary['urgency'] = _count_dicts(
+        _level_counts(cube, ['category'], 'urgency', URGENCY_LEVELS).reindex(summary.index)
+    )
+    return summary
+
+
+def counts_by(cube: pd.Series, dimension: str) -> Dict[str, int]:
+    """Counts of the values of one dimension, most common first."""
+    counts = _totals(cube, [dimension]).sort_values(ascending=False, kind='stable')
+    return counts[counts > 0].to_dict()
+
+
+def counts_by_month(cube: pd.Series) -> Dict[str, int]:
+    """Counts per 'YYYY-MM' month, in month order."""
+    return _totals(cube, ['month']).to_dict()
+
+
+def summary_stats(cube: pd.Series, start, end) -> Dict:
+    """The requests_summary.json statistics, for requests dated start to end."""
+    return {
+        'total_requests': int(cube.sum()),
+        'date_range': {
+            'start': str(start),
+            'end': str(end)
+        },
+        'by_month': counts_by_month(cube),
+        'by_category': counts_by(cube, 'category'),
+        'by_urgency': counts_by(cube, 'urgency'),
+        'by_effort': counts_by(cube, 'effort')
+    }
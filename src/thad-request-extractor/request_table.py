@@ -0,0 +1,200 @@
+"""
+Compact columnar storage for extracted requests, and its Parquet export.
+
+Requests are kept in one DataFrame rather than a list of dicts:
+- request_type, category, urgency and effort are categoricals;
+- month is an integer yyyymm key;
+- date and time are categoricals, since many requests share a day and
+  there are only 1440 distinct minute labels;
+- description and full_text are categoricals over one shared set of
+  distinct texts, so repeated messages, and descriptions identical to
+  their message, are stored once.
+
+Categories are kept sorted so groupby and sort results come out in the
+same order as they would for plain strings.
+"""
+
+import hashlib
+import os
+import shutil
+from typing import Dict
+
+import pandas as pd
+
+REQUEST_COLUMNS = [
+    'datetime', 'date', 'time', 'month', 'request_type', 'category',
+    'description', 'urgency', 'effort', 'full_text', 'message_length'
+]
+
+CATEGORY_COLUMNS = ['request_type', 'category', 'urgency', 'effort', 'time']
+
+
+def month_keys(datetimes: pd.Series) -> pd.Series:
+    """Integer yyyymm month keys for a datetime column."""
+    return (datetimes.dt.year * 100 + datetimes.dt.month).astype('int32')
+
+
+def parse_month_labels(labels: pd.Series) -> pd.Series:
+    """Integer yyyymm month keys for 'YYYY-MM' labels."""
+    return (labels.str[:4].astype('int32') * 100 + labels.str[5:7].astype('int32')).astype('int32')
+
+
+def month_labels(months: pd.Series) -> pd.Series:
+    """'YYYY-MM' labels for integer yyyymm month keys, formatted once per month."""
+    months = months.astype('category')
+    labels = [f'{month // 100:04d}-{month % 100:02d}' for month in months.cat.categories]
+    return months.cat.rename_categories(labels)
+
+
+def _shared_text_categoricals(*columns: pd.Series):
+    """Encode text columns as categoricals over one shared set of distinct texts."""
+    codes, uniques = pd.factorize(pd.concat(columns, ignore_index=True))
+    dtype = pd.CategoricalDtype(uniques)
+    encoded, start = [], 0
+    for column in columns:
+        end = start + len(column)
+        encoded.append(pd.Series(
+            pd.Categorical.from_codes(codes[start:end], dtype=dtype), index=column.index
+        ))
+        start = end
+    return encoded
+
+
+def compact_requests(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert a requests DataFrame to the compact column types.
+
+    month may be given as integer keys or as a Period column.
+    """
+    df = df.reindex(columns=REQUEST_COLUMNS)
+    if isinstance(df['month'].dtype, pd.PeriodDtype):
+        df['month'] = month_keys(df['month'])
+    for column in CATEGORY_COLUMNS:
+        df[column] = df[column].astype('category').cat.remove_unused_categories()
+    df['date'] = pd.Categorical(df['date'], ordered=True).remove_unused_categories()
+    df['description'], df['full_text'] = _shared_text_categoricals(
+        df['description'], df['full_text']
+    )
+    df['message_length'] = pd.to_numeric(df['message_length'], downcast='integer')
+    return df
+
+
+def _time_of_day(labels: pd.Series) -> pd.Series:
+    """datetime.time values for '8:47 AM' style labels, parsed once per label."""
+    labels = labels.astype('category')
+    times = pd.to_datetime(labels.cat.categories, format='%I:%M %p').time
+    return labels.cat.rename_categories(times)
+
+
+def clock_times(labels: pd.Series) -> pd.Series:
+    """24-hour 'HH:MM:SS' strings for '8:47 AM' style labels, as SQL TIME values."""
+    return _time_of_day(labels).cat.rename_categories(
+        lambda time: time.strftime('%H:%M:%S')
+    ).astype(object)
+
+
+def request_keys(df: pd.DataFrame, seen: Dict[str, int] = None) -> pd.Series:
+    """
+    Natural keys of requests: the SHA-1 of the message's date and time and
+    its description, as 40 hex digits.
+
+    A request keeps its key across runs, and across chunked, incremental
+    and full extractions, as long as its message and description do. The
+    same text sent twice in one minute gets a second, numbered key; pass
+    the same seen dict for consecutive chunks of one request table so
+    repeats are numbered across chunks. date may hold datetime.date values
+    or 'YYYY-MM-DD' strings.
+    """
+    if seen is None:
+        seen = {}
+    stamps = df['date'].astype(str) + ' ' + clock_times(df['time']) + '\0'
+    keys = []
+    for stamp, text in zip(stamps, df['description'].astype(str)):
+        key = hashlib.sha1((stamp + text).encode('utf-8')).hexdigest()
+        repeat = seen.get(key, 0)
+        seen[key] = repeat + 1
+        if repeat:
+            key = hashlib.sha1(f'{key}#{repeat}'.encode('ascii')).hexdigest()
+        keys.append(key)
+    return pd.Series(keys, index=df.index, dtype=object)
+
+
+class ParquetMonthWriter:
+    """
+    Writes requests as a Parquet dataset partitioned by month, a frame at
+    a time.
+
+    Each month goes to path/month=YYYY-MM/, one part-NNNNN.parquet file per
+    written frame with rows for that month, numbered so they sort in the
+    order written. Readers can load one month, or all of them with
+    pd.read_parquet(path). date and time are stored as typed date32/time32
+    columns and the low-cardinality columns as dictionaries. The dataset is
+    written next to path and swapped in by close(), replacing the previous
+    one.
+    """
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow (pip install pyarrow)")
+        self._pa, self._pq = pa, pq
+
+        dictionary = pa.dictionary(pa.int32(), pa.string())
+        self.schema = pa.schema([
+            ('datetime', pa.timestamp('ns', tz='America/New_York')),
+            ('date', pa.date32()),
+            ('time', pa.time32('ms')),
+            ('request_type', dictionary),
+            ('category', dictionary),
+            ('description', pa.string()),
+            ('urgency', dictionary),
+            ('effort', dictionary),
+            ('full_text', pa.string()),
+            ('message_length', pa.int32()),
+        ])
+        self.path = path
+        self.staging = f'{path}.tmp'
+        self.parts = 0
+        shutil.rmtree(self.staging, ignore_errors=True)
+
+    def write(self, df: pd.DataFrame):
+        """Add the requests in df to the dataset."""
+        columns = pd.DataFrame({
+            'datetime': pd.to_datetime(df['datetime'], utc=True).dt.tz_convert('America/New_York'),
+            'date': df['date'].astype(object),
+            'time': _time_of_day(df['time']).astype(object),
+            'request_type': df['request_type'],
+            'category': df['category'],
+            # Text is stored plain: a shared dictionary would be copied into
+            # every month's file
+            'description': df['description'].astype(object),
+            'urgency': df['urgency'],
+            'effort': df['effort'],
+            'full_text': df['full_text'].astype(object),
+            'message_length': df['message_length'].astype('Int32'),
+        })
+
+        for label, part in columns.groupby(month_labels(df['month']).to_numpy(), sort=True):
+            directory = os.path.join(self.staging, f'month={label}')
+            os.makedirs(directory, exist_ok=True)
+            table = self._pa.Table.from_pandas(part, schema=self.schema, preserve_index=False)
+            self._pq.write_table(table, os.path.join(directory, f'part-{self.parts:05d}.parquet'))
+        self.parts += 1
+
+    def close(self):
+        """Swap the written dataset in place of the previous one."""
+        os.makedirs(self.staging, exist_ok=True)
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(self.staging, self.path)
+
+
+def write_parquet_by_month(df: pd.DataFrame, path: str):
+    """
+    Write requests as a Parquet dataset partitioned by month, one
+    path/month=YYYY-MM/part-00000.parquet file per month (see ParquetMonthWriter).
+    """
+    writer = ParquetMonthWriter(path)
+    writer.write(df)
+    writer.close()
@@ -0,0 +1,197 @@
+"""
+Compiled rule packs built from the declarative rules file.
+
+The classification rules live in rules.json: request patterns in priority
+order, exclusion patterns and keyword lists. A RulePack is everything
+RequestExtractor derives from them: the compiled regexes, the keyword
+matcher's trie, the rules' prefilter literals and priority table, and the
+combined column-wise regexes. Compiling a pack walks every pattern and
+keyword list; loading one only recompiles the final regexes, which is all
+Python's re lets a pickle store.
+
+Packs are cached on disk under the SHA-256 of the rules file, so a process
+that starts with rules it has seen before loads a pack instead of compiling
+one. RulePackStore holds the current pack of a rules file and swaps in a
+new one when the file changes; readers take store.pack once per batch and
+never see a mix of old and new rules.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+from typing import Dict, List, Optional
+
+from compiled_rules import CompiledRequestRules, anchored_and_unanchored
+from keyword_matcher import KeywordMatcher, trie_pattern
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules.json')
+
+# Bump when RulePack's fields change, so cached packs are rebuilt
+PACK_FORMAT = 1
+
+RULE_SECTIONS = [
+    'request_patterns', 'urgency_indicators', 'action_keywords', 'work_keywords',
+    'exclusion_patterns', 'reaction_keywords', 'non_request_phrases',
+]
+
+
+def _compile_pattern(spec: Dict) -> re.Pattern:
+    """Compile a {'pattern': ..., 'flags': [...]} entry of the rules file."""
+    flags = 0
+    for name in spec.get('flags', []):
+        if name not in re.RegexFlag.__members__:
+            raise ValueError(f"Unknown regex flag {name!r} for pattern {spec['pattern']!r}")
+        flags |= re.RegexFlag[name]
+    return re.compile(spec['pattern'], flags)
+
+
+class RulePack:
+    """The classification rules of one rules file, compiled."""
+
+    def __init__(self, source: Dict, content_hash: str):
+        missing = [section for section in RULE_SECTIONS if section not in source]
+        if missing:
+            raise ValueError(f"Rules file is missing sections: {', '.join(missing)}")
+        self.content_hash = content_hash
+
+        # The rules as request_patterns.py has always exposed them
+        self.request_patterns: List[Dict] = [
+            {
+                'pattern': _compile_pattern(rule),
+                'type': rule['type'],
+                'category': rule['category'],
+                'default_effort': rule['default_effort'],
+                'keywords': rule.get('keywords', []),
+            }
+            for rule in source['request_patterns']
+        ]
+        self.urgency_indicators: Dict[str, List[str]] = source['urgency_indicators']
+        self.action_keywords: List[str] = source['action_keywords']
+        self.work_keywords: List[str] = source['work_keywords']
+        self.exclusion_patterns: List[re.Pattern] = [
+            _compile_pattern(spec) for spec in source['exclusion_patterns']
+        ]
+        self.reaction_keywords: List[str] = source['reaction_keywords']
+        self.non_request_phrases: List[str] = source['non_request_phrases']
+
+        # Per-message matching: rules in priority order with their prefilter
+        # literals, and every keyword list in one trie
+        self.request_rules = CompiledRequestRules(self.request_patterns)
+        self.keyword_matcher = KeywordMatcher({
+            'work': self.work_keywords,
+            'action': self.action_keywords,
+            'urgency_high': self.urgency_indicators['high'],
+            'urgency_low': self.urgency_indicators['low'],
+            'reaction': self.reaction_keywords,
+            'non_request': [phrase.lower() for phrase in self.non_request_phrases],
+            **self.request_rules.keyword_lists(),
+        })
+
+        # Column-wise matching: one regex per check
+        self.anchored_exclusions, self.unanchored_exclusions = anchored_and_unanchored(
+            self.exclusion_patterns
+        )
+        self.reaction_regex = re.compile(trie_pattern(self.reaction_keywords))
+        self.work_regex = re.compile(trie_pattern(self.work_keywords))
+        self.action_regex = re.compile(trie_pattern(self.action_keywords))
+        self.urgency_high_regex = re.compile(trie_pattern(self.urgency_indicators['high']))
+        self.urgency_low_regex = re.compile(trie_pattern(self.urgency_indicators['low']))
+        self.non_request_prefixes = tuple(phrase.lower() for phrase in self.non_request_phrases)
+
+
+def content_hash(data: bytes) -> str:
+    """Cache key of a rules file's contents."""
+    return hashlib.sha256(str(PACK_FORMAT).encode('ascii') + b'\0' + data).hexdigest()
+
+
+def compile_rule_pack(data: bytes) -> RulePack:
+    """Compile the contents of a rules file. Raises ValueError for invalid rules."""
+    try:
+        source = json.loads(data)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Rules file is not valid JSON: {e}") from e
+    try:
+        return RulePack(source, content_hash(data))
+    except (re.error, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid rule: {e!r}") from e
+
+
+def load_rule_pack(path: str = RULES_FILE, cache_dir: str = None) -> RulePack:
+    """
+    The rule pack of a rules file.
+
+    With cache_dir, a pack compiled earlier from the same contents is loaded
+    from there, and a newly compiled one is saved for next time.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    key = content_hash(data)
+
+    cache_file = os.path.join(cache_dir, f'{key}.pack') if cache_dir else None
+    if cache_file and os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                pack = pickle.load(f)
+            if isinstance(pack, RulePack) and pack.content_hash == key:
+                return pack
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            pass
+
+    pack = compile_rule_pack(data)
+    if cache_file:
+        os.makedirs(cache_dir, exist_ok=True)
+        staging = f'{cache_file}.{os.getpid()}.tmp'
+        with open(staging, 'wb') as f:
+            pickle.dump(pack, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(staging, cache_file)
+    return pack
+
+
+_default_pack: Optional[RulePack] = None
+
+
+def default_rule_pack() -> RulePack:
+    """The pack of the bundled rules.json, compiled once per process."""
+    global _default_pack
+    if _default_pack is None:
+        _default_pack = load_rule_pack(RULES_FILE)
+    return _default_pack
+
+
+class RulePackStore:
+    """
+    The current rule pack of a rules file, for long-running processes.
+
+    reload() picks up edits to the file: the new pack is loaded (or
+    compiled) first and then swapped in with one assignment, so a reader
+    holding store.pack keeps a complete pack. A file that fails to compile
+    raises ValueError and leaves the current pack in place.
+    """
+
+    def __init__(self, path: str = RULES_FILE, cache_dir: str = None):
+        self.path = path
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._stamp = self._file_stamp()
+        self.pack = load_rule_pack(path, cache_dir)
+
+    def _file_stamp(self):
+        """Modification time and size of the rules file, to spot edits cheaply."""
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self, force: bool = False) -> bool:
+        """Swap in the rules file's pack if the file changed. Returns whether it did."""
+        with self._lock:
+            stamp = self._file_stamp()
+            if stamp == self._stamp and not force:
+                return False
+            pack = load_rule_pack(self.path, self.cache_dir)
+            self._stamp = stamp
+            if pack.content_hash == self.pack.content_hash:
+                return False
+            self.pack = pack
+            return True
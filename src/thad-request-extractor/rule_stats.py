@@ -0,0 +1,88 @@
+"""
+Per-rule hit counts and timings for classification runs.
+
+With a RuleStats attached, RequestExtractor times every check of its
+column-wise classification: each EXCLUSION_PATTERNS regex (checked one
+by one instead of through the combined regexes), each REQUEST_PATTERNS
+rule and each keyword gate (reactions, non-request phrases, short
+messages, work and action keywords, urgency). For each check it counts
+the texts it ran on, the texts it matched and the texts it decided, i.e.
+where it was the first check to match and so set the outcome.
+
+Counts are over distinct message texts, as classification sees them;
+texts answered by the classification cache are not classified and so
+not counted. Rules that never match, or that match but never decide
+because an earlier rule always wins, are candidates for deletion or
+reordering.
+"""
+
+import json
+import time
+from typing import Callable, Dict, List, Tuple
+
+import pandas as pd
+
+
+class RuleStats:
+    def __init__(self):
+        """Collect rule statistics over any number of classification passes."""
+        self.texts = 0
+        self.records: Dict[Tuple[str, str], Dict] = {}
+
+    def _record(self, kind: str, name: str, pattern: str = None) -> Dict:
+        """The record of one check, created on first use."""
+        return self.records.setdefault((kind, name), {
+            'kind': kind, 'name': name, 'pattern': pattern,
+            'evaluated': 0, 'matched': 0, 'decided': 0, 'seconds': 0.0,
+        })
+
+    def check(self, kind: str, name: str, values: pd.Series,
+              check: Callable[[pd.Series], pd.Series], pattern: str = None) -> pd.Series:
+        """Run check on values, a boolean Series per value, and record it."""
+        start = time.perf_counter()
+        matched = check(values)
+        record = self._record(kind, name, pattern)
+        record['seconds'] += time.perf_counter() - start
+        record['evaluated'] += len(values)
+        record['matched'] += int(matched.sum())
+        return matched
+
+    def decided(self, kind: str, name: str, count: int):
+        """Record that a check set the outcome for count texts."""
+        self._record(kind, name)['decided'] += int(count)
+
+    def report(self) -> Dict:
+        """Every check's counts and time, plus the rules that never matched or decided."""
+        rules = []
+        for record in self.records.values():
+            record = dict(record)
+            record['seconds'] = round(record['seconds'], 6)
+            record['us_per_text'] = (
+                round(record['seconds'] * 1e6 / record['evaluated'], 3)
+                if record['evaluated'] else None
+            )
+            rules.append(record)
+        patterns = [rule for rule in rules if rule['kind'] in ('exclusion', 'request')]
+        return {
+            'texts_classified': self.texts,
+            'seconds': round(sum(rule['seconds'] for rule in rules), 6),
+            'never_matched': [
+                f"{rule['kind']} {rule['name']}" for rule in patterns
+                if rule['evaluated'] and not rule['matched']
+            ],
+            'never_decided': [
+                f"{rule['kind']} {rule['name']}" for rule in patterns
+                if rule['matched'] and not rule['decided']
+            ],
+            'rules': rules,
+        }
+
+    def slowest(self, limit: int = 5) -> List[Dict]:
+        """The checks that took the most time, slowest first."""
+        return sorted(self.report()['rules'], key=lambda rule: rule['seconds'], reverse=True)[:limit]
+
+    def write(self, path: str):
+        """Write the report as JSON."""
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+            f.write('\n')
@@ -0,0 +1,156 @@
+"""
+Per-stage timing and resource metrics for pipeline runs.
+
+StageMetrics times named stages with a context manager, recording wall
+and CPU time, rows in and out, rows/sec and the peak RSS reached during
+the stage. Stages nest: a stage opened inside another is recorded as
+'outer/inner'. A stage entered more than once, e.g. once per chunk, adds
+up into one record with a call count.
+
+On Linux the peak RSS is reset when a stage starts, so every stage
+reports its own peak; elsewhere it is the process peak so far. CPU time
+and memory cover this process only, not the cleaner's worker processes.
+Stages entered with profile=True are also run under cProfile, and the
+combined profile can be dumped for pstats or snakeviz.
+"""
+
+import cProfile
+import json
+import platform
+import re
+import resource
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, Optional
+
+
+def reset_peak_rss() -> bool:
+    """Reset the process's peak RSS to its current RSS (Linux only). Returns whether it worked."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb(children: bool = False) -> float:
+    """
+    Peak RSS of this process in MB, since the last reset where supported,
+    or with children=True of its largest finished child process.
+    """
+    if not children:
+        try:
+            with open('/proc/self/status') as f:
+                return int(re.search(r'VmHWM:\s+(\d+)', f.read()).group(1)) / 1024
+        except (OSError, AttributeError):
+            pass
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+class StageMetrics:
+    def __init__(self):
+        """Collect metrics for the stages of one run."""
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.stages: Dict[str, Dict] = {}
+        self.per_stage_peak = True
+        self.profiler: Optional[cProfile.Profile] = None
+        self._open = []
+
+    @contextmanager
+    def stage(self, name: str, rows_in: int = None, profile: bool = False):
+        """
+        Time the stage name for the duration of the with block.
+
+        Yields a dict whose 'rows_in' and 'rows_out' entries the caller can
+        set once they are known; rows_in may also be given up front.
+        """
+        counts = {'rows_in': rows_in, 'rows_out': None}
+        peak = peak_rss_mb()
+        for entry in self._open:
+            entry['peak'] = max(entry['peak'], peak)
+        self.per_stage_peak = reset_peak_rss() and self.per_stage_peak
+
+        if self._open:
+            name = f"{self._open[-1]['name']}/{name}"
+        entry = {'name': name, 'peak': 0.0}
+        self._open.append(entry)
+        # Created up front so stages are listed in the order they started
+        self.stages.setdefault(name, {
+            'stage': name, 'calls': 0, 'seconds': 0.0, 'cpu_seconds': 0.0,
+            'rows_in': None, 'rows_out': None, 'rows_per_sec': None, 'peak_rss_mb': 0.0,
+        })
+        if profile:
+            if self.profiler is None:
+                self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield counts
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            if profile:
+                self.profiler.disable()
+            self._open.pop()
+            peak = max(entry['peak'], peak_rss_mb())
+            if self._open:
+                self._open[-1]['peak'] = max(self._open[-1]['peak'], peak)
+            self._record(entry['name'], wall, cpu, counts, peak)
+
+    def _record(self, name: str, wall: float, cpu: float, counts: Dict, peak: float):
+        """Add one pass through a stage to its record."""
+        record = self.stages[name]
+        record['calls'] += 1
+        record['seconds'] += wall
+        record['cpu_seconds'] += cpu
+        for key in ('rows_in', 'rows_out'):
+            if counts[key] is not None:
+                record[key] = (record[key] or 0) + int(counts[key])
+        record['peak_rss_mb'] = max(record['peak_rss_mb'], peak)
+
+    def report(self) -> Dict:
+        """The metrics of every stage so far, in the order the stages started."""
+        stages = []
+        for record in self.stages.values():
+            record = dict(record)
+            if record['rows_in'] is not None and record['seconds'] > 0:
+                record['rows_per_sec'] = round(record['rows_in'] / record['seconds'], 1)
+            record['seconds'] = round(record['seconds'], 4)
+            record['cpu_seconds'] = round(record['cpu_seconds'], 4)
+            record['peak_rss_mb'] = round(record['peak_rss_mb'], 1)
+            stages.append(record)
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'total_seconds': round(time.perf_counter() - self.start, 4),
+            # Without per-stage peaks, peak_rss_mb is the process peak so far
+            'per_stage_peak_rss': self.per_stage_peak,
+            'stages': stages,
+        }
+
+    def write(self, path: str, **extra):
+        """Write the report, plus any extra top-level entries, as JSON."""
+        with open(path, 'w') as f:
+            json.dump({**self.report(), **extra}, f, indent=2)
+            f.write('\n')
+
+    def dump_profile(self, path: str) -> bool:
+        """Dump the cProfile stats of the profiled stages; False if none ran."""
+        if self.profiler is None:
+            return False
+        self.profiler.dump_stats(path)
+        return True
+
+
+def measure(metrics: Optional[StageMetrics], name: str, rows_in: int = None,
+            profile: bool = False):
+    """metrics.stage(...), or a no-op context yielding a scratch dict without metrics."""
+    if metrics is None:
+        return nullcontext({'rows_in': rows_in, 'rows_out': None})
+    return metrics.stage(name, rows_in, profile)
@@ -0,0 +1,123 @@
+"""
+Streaming Excel export for the requests workbook.
+
+Sheets are written through openpyxl's write-only workbook, which
+serialises each row to disk as it is appended instead of keeping a cell
+object for every value, so memory stays flat however many requests are
+exported. Rows are converted from the DataFrame a chunk at a time.
+
+The layout follows DataFrame.to_excel: bold, bordered, centred header
+and index cells, and dicts written as their str(). Write-only sheets
+cannot merge cells, so a repeated outer index label is written once and
+the cells below it are left blank, which is what a merged cell holds.
+"""
+
+import os
+from typing import Iterable, List, Tuple
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
+# Rows converted from the DataFrame at a time
+ROWS_PER_CHUNK = 10000
+
+_THIN = Side(style='thin')
+HEADER_FONT = Font(bold=True)
+HEADER_BORDER = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='top')
+
+
+def _header_cell(sheet, value) -> WriteOnlyCell:
+    """A header or index cell styled the way to_excel styles them."""
+    cell = WriteOnlyCell(sheet, value=value)
+    cell.font = HEADER_FONT
+    cell.border = HEADER_BORDER
+    cell.alignment = HEADER_ALIGNMENT
+    return cell
+
+
+def _cell_value(value):
+    """Convert a DataFrame value to something openpyxl can write."""
+    if isinstance(value, (dict, list, tuple, set)):
+        return str(value)
+    return value
+
+
+def _object_values(frame: pd.DataFrame) -> pd.DataFrame:
+    """frame as Python objects, with missing values as None (empty cells)."""
+    values = frame.astype(object)
+    return values.where(values.notna(), None)
+
+
+def _append_rows(sheet, frame: pd.DataFrame):
+    """Append the rows of frame, without its index, a chunk at a time."""
+    for start in range(0, len(frame), ROWS_PER_CHUNK):
+        chunk = frame.iloc[start:start + ROWS_PER_CHUNK]
+        for row in _object_values(chunk).itertuples(index=False, name=None):
+            sheet.append([_cell_value(value) for value in row])
+
+
+def write_sheet(workbook: Workbook, title: str, frame: pd.DataFrame, index: bool = False):
+    """Append frame to workbook as a sheet, a chunk of rows at a time."""
+    sheet = workbook.create_sheet(title)
+    index_names = list(frame.index.names) if index else []
+    sheet.append([_header_cell(sheet, name) for name in index_names + list(frame.columns)])
+    if not index:
+        _append_rows(sheet, frame)
+        return
+
+    previous = ()
+    for start in range(0, len(frame), ROWS_PER_CHUNK):
+        chunk = frame.iloc[start:start + ROWS_PER_CHUNK]
+        values = _object_values(chunk).itertuples(index=False, name=None)
+        labels = _object_values(chunk.index.to_frame(index=False)).itertuples(index=False, name=None)
+        for label, row in zip(labels, values):
+            # Outer levels are blank while they repeat the row above, as
+            # in to_excel's merged cells; the innermost level is always shown
+            cells = []
+            for level, value in enumerate(label):
+                repeated = level < len(label) - 1 and label[:level + 1] == previous[:level + 1]
+                cells.append(_header_cell(sheet, None if repeated else _cell_value(value)))
+            previous = label
+            sheet.append(cells + [_cell_value(value) for value in row])
+
+
+def _save(workbook: Workbook, path: str):
+    """Save next to path and then move into place, so a reader never sees a half-written file."""
+    staging = f'{path}.tmp'
+    workbook.save(staging)
+    os.replace(staging, path)
+
+
+def write_workbook(path: str, sheets: Iterable[Tuple[str, pd.DataFrame, bool]]):
+    """Write (title, frame, index) sheets to an .xlsx file at path."""
+    workbook = Workbook(write_only=True)
+    for title, frame, index in sheets:
+        write_sheet(workbook, title, frame, index)
+    _save(workbook, path)
+
+
+class StreamingWorkbook:
+    """
+    A workbook whose first sheet is filled in a frame at a time, for
+    exports that never hold all their rows at once. The remaining sheets
+    are written whole by finish(), which saves the workbook.
+    """
+
+    def __init__(self, path: str, title: str, columns: List[str]):
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet(title)
+        self.sheet.append([_header_cell(self.sheet, name) for name in columns])
+
+    def append(self, frame: pd.DataFrame):
+        """Append the rows of frame to the first sheet."""
+        _append_rows(self.sheet, frame)
+
+    def finish(self, sheets: Iterable[Tuple[str, pd.DataFrame, bool]]):
+        """Write the remaining (title, frame, index) sheets and save."""
+        for title, frame, index in sheets:
+            write_sheet(self.workbook, title, frame, index)
+        _save(self.workbook, self.path)
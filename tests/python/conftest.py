@@ -0,0 +1,13 @@
+"""Put process.py, the pipeline's modules and the benchmark corpus generator on sys.path."""
+
+import sys
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parents[2]
+sys.path[:0] = [
+    str(REPO_DIR),
+    str(REPO_DIR / 'src'),
+    str(REPO_DIR / 'src' / 'thad-request-extractor'),
+    str(REPO_DIR / 'benchmarks'),
+    str(Path(__file__).resolve().parent),
+]
@@ -0,0 +1,34 @@
+"""
+Runs process.py end to end on synthetic exports, for the pipeline tests.
+"""
+
+import csv
+import sys
+from unittest import mock
+
+import process
+from generate_corpus import COLUMNS, generate_rows
+
+
+def corpus_rows(rows: int, seed: int) -> list:
+    """The rows of a synthetic export, as csv.reader reads them back."""
+    return [[str(value) for value in row] for row in generate_rows(rows, seed=seed)]
+
+
+def write_export(path, rows: list, columns: list = COLUMNS):
+    """Write a raw export of rows to path."""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+
+def run_process(*args):
+    """Run process.py with args in the current directory; a failed run raises SystemExit."""
+    with mock.patch.object(sys, 'argv', ['process.py', *args]):
+        process.main()
+
+
+def read_bytes(path) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
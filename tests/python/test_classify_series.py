@@ -0,0 +1,95 @@
+"""
+RequestExtractor.classify_series, which classifies a column of messages
+with one regex pass per rule, against classifying them one by one.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_preprocessor import clean_message_text
+from generate_corpus import generate_rows
+from request_extractor import RequestExtractor
+from rule_stats import RuleStats
+from test_compiled_rules import fuzzed_messages
+
+CORPUS_ROWS = 10_000
+FUZZ_MESSAGES = 5_000
+
+REQUEST = 'can you please update the contact form on the website today, it is urgent'
+
+# Openings each matching one exclusion pattern, some of them (case and
+# anchoring) only in the bare form
+EXCLUDED_OPENINGS = [
+    'all good', 'got it', 'perfect', 'thanks', 'thank you', 'ok', 'okay', 'yes', 'no',
+    'sounds good', 'works for me', 'let me know', 'just wanted to let you know',
+    'just wanted to update', 'got some photos that might', "i'll call", 'just emailed',
+    'respectfully', 'sorry to bother', 'lol', 'haha',
+]
+
+EDGE_CASES = (
+    ['', ' ', '\n', 'please help', 'need help', 'Please help', 'fix it', 'please fix the form',
+     'Liked "can you update the form"', 'Emphasized "fix the site asap"', 'liked it',
+     'Loved “please update the website”', 'Laughed at "fix the form"',
+     'Disliked "update the contact form please"', 'Questioned "can you fix the site"',
+     'Thanks! ' + REQUEST, 'ASAP ' + REQUEST.upper(), REQUEST + ' when you get a chance']
+    + [opening + ' ' + REQUEST for opening in EXCLUDED_OPENINGS]
+    + [opening.capitalize() + ' ' + REQUEST for opening in EXCLUDED_OPENINGS]
+    + [opening + '\n' + REQUEST for opening in EXCLUDED_OPENINGS]
+    + [REQUEST + ' ' + opening for opening in EXCLUDED_OPENINGS]
+    + EXCLUDED_OPENINGS
+)
+
+
+def one_by_one(extractor: RequestExtractor, text: str) -> tuple:
+    """The classification of the per-message path."""
+    request_type, category, effort = extractor.extract_request_type(text)
+    urgency = extractor.extract_urgency(text) if request_type else None
+    return request_type, category, effort, urgency
+
+
+@pytest.fixture(scope='module')
+def messages() -> list:
+    raw = [row[3] for row in generate_rows(CORPUS_ROWS, seed=4)]
+    return EDGE_CASES + raw + [clean_message_text(text) for text in raw] + fuzzed_messages(
+        FUZZ_MESSAGES, seed=1
+    )
+
+
+@pytest.mark.parametrize('rule_stats', [False, True], ids=['folded', 'rule-stats'])
+def test_classify_series_matches_one_by_one(messages, rule_stats):
+    # With rule stats the exclusion patterns are checked one by one
+    # instead of as the folded anchored and unanchored regexes
+    extractor = RequestExtractor(rule_stats=RuleStats() if rule_stats else None)
+    classified = extractor.classify_series(pd.Series(messages, dtype=object))
+    expected = [one_by_one(extractor, text) for text in messages]
+    assert list(classified.itertuples(index=False, name=None)) == expected
+
+
+def test_messages_exercise_every_outcome(messages):
+    extractor = RequestExtractor()
+    classified = extractor.classify_series(pd.Series(messages, dtype=object))
+    rules = extractor.rules.request_patterns
+    assert set(classified['request_type'].dropna()) == (
+        {rule['type'] for rule in rules} | {'General Request'}
+    )
+    assert set(classified['urgency'].dropna()) == {'High', 'Medium', 'Low'}
+    assert classified['request_type'].isna().any()
+
+
+def test_classify_series_keeps_index_and_repeats():
+    extractor = RequestExtractor()
+    texts = pd.Series([REQUEST, 'ok', REQUEST, ''], index=[9, 4, 4, 1])
+    classified = extractor.classify_series(texts)
+    assert list(classified.index) == [9, 4, 4, 1]
+    assert list(classified.itertuples(index=False, name=None)) == [
+        one_by_one(extractor, text) for text in texts
+    ]
+
+
+def test_missing_texts_are_not_requests():
+    extractor = RequestExtractor()
+    classified = extractor.classify_series(pd.Series([np.nan, None, REQUEST], dtype=object))
+    assert list(classified.iloc[0]) == [None] * 4
+    assert list(classified.iloc[1]) == [None] * 4
+    assert tuple(classified.iloc[2]) == one_by_one(extractor, REQUEST)
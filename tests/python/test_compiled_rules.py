@@ -0,0 +1,89 @@
+"""
+CompiledRequestRules against searching REQUEST_PATTERNS one by one.
+"""
+
+import random
+import re
+
+import pytest
+
+from compiled_rules import CompiledRequestRules
+from generate_corpus import generate_rows
+from request_patterns import REQUEST_PATTERNS
+from rule_pack import default_rule_pack
+
+FUZZ_MESSAGES = 20_000
+CORPUS_ROWS = 10_000
+
+# Text around the rule keywords, including non-ASCII characters whose
+# lowercase differs in length or meaning ('İ', the Kelvin sign)
+FILLER = [' ', '  ', '\n', '.', ', ', '?', 'the', 'our', 'ok', 'é', 'İ', 'K', 'ß', '’', 's']
+
+
+def sequential_match(text: str):
+    """The first rule whose regex searches successfully, the unoptimized way."""
+    for rule in REQUEST_PATTERNS:
+        if re.search(rule['pattern'], text):
+            return rule['type'], rule['category'], rule['default_effort']
+    return None
+
+
+def rule_words() -> list:
+    """The keywords and literal runs of every request rule."""
+    words = set()
+    for rule in REQUEST_PATTERNS:
+        words.update(rule['keywords'])
+        words.update(
+            word.strip() for word in re.findall(r'[a-z ]+', rule['pattern'].pattern)
+            if word.strip()
+        )
+    return sorted(words)
+
+
+def fuzzed_messages(count: int, seed: int = 0) -> list:
+    """Messages mixing rule words, in varying case, with filler."""
+    rng = random.Random(seed)
+    words = rule_words()
+    cases = [str, str.upper, str.title, lambda word: word[:1].upper() + word[1:]]
+    messages = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(1, 6)):
+            parts.append(rng.choice(cases)(rng.choice(words)))
+            parts.append(rng.choice(FILLER))
+        messages.append(''.join(parts))
+    return messages
+
+
+@pytest.fixture(scope='module')
+def messages() -> list:
+    corpus = [row[3] for row in generate_rows(CORPUS_ROWS, seed=2)]
+    return [''] + rule_words() + corpus + fuzzed_messages(FUZZ_MESSAGES)
+
+
+@pytest.fixture(scope='module')
+def pack():
+    return default_rule_pack()
+
+
+def test_messages_exercise_every_rule(messages):
+    matched = {sequential_match(text) for text in messages}
+    for rule in REQUEST_PATTERNS:
+        assert (rule['type'], rule['category'], rule['default_effort']) in matched
+
+
+def test_match_without_prefilter(messages, pack):
+    for text in messages:
+        assert pack.request_rules.match(text) == sequential_match(text), repr(text)
+
+
+def test_match_with_prefilter(messages, pack):
+    for text in messages:
+        hits = pack.keyword_matcher.scan(text.lower())
+        assert pack.request_rules.match(text, hits) == sequential_match(text), repr(text)
+
+
+def test_rules_compiled_from_request_patterns(messages, pack):
+    rules = CompiledRequestRules(REQUEST_PATTERNS)
+    for text in messages[:2000]:
+        assert rules.match(text) == pack.request_rules.match(text), repr(text)
@@ -0,0 +1,86 @@
+"""
+--incremental runs of process.py against one full run of the same export.
+"""
+
+import os
+
+import pytest
+
+import process
+from pipeline import corpus_rows, read_bytes, run_process, write_export
+
+CORPUS_ROWS = 3000
+PREFIX_ROWS = 1700
+
+OUTPUTS = ('requests_by_month.csv', 'requests_summary.json')
+
+
+@pytest.fixture(scope='module')
+def rows() -> list:
+    return corpus_rows(CORPUS_ROWS, seed=6)
+
+
+def outputs(output_dir: str) -> dict:
+    return {name: read_bytes(os.path.join(output_dir, name)) for name in OUTPUTS}
+
+
+def full_run(rows: list) -> dict:
+    """The outputs of one full run over rows, in the current directory."""
+    write_export('full.csv', rows)
+    run_process('--input', 'full.csv', '--no-excel', '--output-dir', 'full')
+    return outputs('full')
+
+
+def incremental_run(*inputs: str):
+    run_process('--input', *inputs, '--incremental', '--no-excel', '--output-dir', 'incremental')
+
+
+def test_prefix_then_full_export_matches_full_run(rows, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    write_export('export.csv', rows[:PREFIX_ROWS])
+    incremental_run('export.csv')
+    # The export grows by the messages sent since
+    write_export('export.csv', rows)
+    incremental_run('export.csv')
+
+    assert outputs('incremental') == full_run(rows)
+    watermark = process.load_watermark('incremental')
+    assert watermark['rows'] == CORPUS_ROWS
+
+    capsys.readouterr()
+    incremental_run('export.csv')
+    assert "No new messages since the last run" in capsys.readouterr().out
+    assert outputs('incremental') == full_run(rows)
+    assert process.load_watermark('incremental') == watermark
+
+
+def test_rewritten_export_is_processed_again(rows, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    write_export('export.csv', rows[:PREFIX_ROWS])
+    incremental_run('export.csv')
+    # An export that no longer has the watermark row where it was
+    rewritten = rows[PREFIX_ROWS // 2:]
+    write_export('export.csv', rewritten)
+    capsys.readouterr()
+    incremental_run('export.csv')
+
+    assert "reprocessing everything" in capsys.readouterr().out
+    assert outputs('incremental') == full_run(rewritten)
+
+
+def test_several_inputs_use_the_message_index(rows, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_export('older.csv', rows[:PREFIX_ROWS])
+    write_export('newer.csv', rows[PREFIX_ROWS - 200:])
+    incremental_run('older.csv', 'newer.csv')
+
+    assert os.path.exists(process.MESSAGE_INDEX)
+    assert process.load_watermark('incremental') is None
+    assert outputs('incremental') == full_run(rows)
+
+
+def test_parquet_is_rejected(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(SystemExit):
+        run_process('--incremental', '--parquet')
+    assert '--parquet cannot be combined with --incremental' in capsys.readouterr().err
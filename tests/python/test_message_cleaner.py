@@ -0,0 +1,95 @@
+"""
+MessageCleaner and clean_series against the legacy clean_message_text.
+"""
+
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_preprocessor import (
+    ARTIFACT_SYMBOLS, COMMON_STARTERS, PREFIX_FIXES, MessageCleaner, clean_message_text,
+    clean_series
+)
+from generate_corpus import generate_rows
+from legacy_cleaner import legacy_clean_message_text
+
+FUZZ_MESSAGES = 20_000
+CORPUS_ROWS = 10_000
+
+# Pieces the fuzzed messages are built from: the artifacts, prefixes and
+# reactions the cleaner handles, and the characters its checks hinge on
+PREFIXES = (
+    list(PREFIX_FIXES) + list(ARTIFACT_SYMBOLS) + list('BKLaz49') +
+    ['+', '++', 'streamtyped @ NSAttributedString NSObject +', 'streamtyped @ +', '""']
+)
+PIECES = (
+    list(COMMON_STARTERS) + list(PREFIX_FIXES.values()) +
+    ['Liked', 'Emphasized', 'Disliked', 'Liked "', 'Emphasized "ok"', 'Disliked \n',
+     'iI', 'iI NSDictionary', 'NSDictionary', '\n', '\n\n', '\r\n', ' ', '  ', '\t',
+     '\x00', '\x07', '\x1f', '￼', '"', '""', ', ', '. ', '! ', 'ok', 'sounds good',
+     'can you update the form', 'x', 'é', '’']
+)
+
+EDGE_CASES = [
+    '', ' ', '\n', 'a', 'I', 'iI', '+', '""', '""x""', 'K, I\'m on it', 'B. We can',
+    ']I\'ll check', 'Liked "Happy Friday"', 'Liked it', 'Liked\n', 'Liked\nthat',
+    'Liked \nthat\n', 'hello\nEmphasized ', 'ok\nLiked "x"\n', 'line one\nLiked\nline three',
+    'streamtyped @ NSString +JPlease fix it', 'text iI junk NSDictionary',
+    'first iI line\nsecond line', 'first\nlast iI tail\n', '￼TGood morning',
+    'iI' * 200 + '\nfoo',
+]
+
+
+def fuzzed_messages(count: int, seed: int = 0) -> list:
+    """Messages stitched together from PREFIXES and PIECES."""
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        parts = [rng.choice(PREFIXES)] if rng.random() < 0.7 else []
+        parts += rng.choices(PIECES, k=rng.randint(0, 6))
+        messages.append(''.join(parts))
+    return messages
+
+
+def corpus_messages() -> list:
+    """The message texts of a synthetic benchmark corpus."""
+    return [row[3] for row in generate_rows(CORPUS_ROWS, seed=1)]
+
+
+@pytest.fixture(scope='module')
+def messages() -> list:
+    return EDGE_CASES + fuzzed_messages(FUZZ_MESSAGES) + corpus_messages()
+
+
+def test_clean_matches_legacy(messages):
+    cleaner = MessageCleaner()
+    for text in messages:
+        assert cleaner.clean(text) == legacy_clean_message_text(text), repr(text)
+
+
+def test_clean_message_text_matches_legacy(messages):
+    for text in messages:
+        assert clean_message_text(text) == legacy_clean_message_text(text), repr(text)
+
+
+def test_clean_series_matches_legacy(messages):
+    cleaned = clean_series(pd.Series(messages, dtype=object))
+    assert list(cleaned.index) == list(range(len(messages)))
+    for text, value in zip(messages, cleaned):
+        assert value == legacy_clean_message_text(text), repr(text)
+
+
+def test_clean_series_cleans_missing_values_to_empty():
+    series = pd.Series([None, np.nan, '', 'Liked "x"', 'JPlease fix it'], dtype=object)
+    assert list(clean_series(series)) == ['', '', '', '', 'Please fix it']
+
+
+def test_clean_series_keeps_index():
+    series = pd.Series(['TGood morning', 'Liked "x"'], index=[7, 3])
+    assert clean_series(series).to_dict() == {7: 'Good morning', 3: ''}
+
+
+def test_clean_series_empty():
+    assert clean_series(pd.Series([], dtype=object)).empty
@@ -0,0 +1,95 @@
+"""
+MessageIndex, and indexed incremental runs over overlapping exports
+against one full run.
+"""
+
+import os
+
+import pytest
+
+from generate_corpus import COLUMNS
+from message_index import MessageIndex
+from pipeline import corpus_rows, read_bytes, run_process, write_export
+
+CORPUS_ROWS = 3000
+# The older export ends, and the newer one starts, inside the other
+OLDER_END, NEWER_START = 1800, 1200
+
+OLD_FORMAT_COLUMNS = [
+    {'message': 'message_text', 'sent_at': 'message_date'}.get(column, column)
+    for column in COLUMNS
+]
+
+
+@pytest.fixture(scope='module')
+def rows() -> list:
+    return corpus_rows(CORPUS_ROWS, seed=3)
+
+
+def test_overlapping_exports_are_read_once(rows):
+    index = MessageIndex()
+    newer, older = rows[NEWER_START:], rows[:OLDER_END]
+    assert index.new_rows(COLUMNS, newer) == newer
+    assert index.new_rows(COLUMNS, older) == rows[:NEWER_START]
+    assert index.new_rows(OLD_FORMAT_COLUMNS, rows) == []
+    assert index.added == CORPUS_ROWS
+    assert index.duplicates == (OLDER_END - NEWER_START) + CORPUS_ROWS
+
+
+def test_repeats_within_an_export_are_read_once(rows):
+    index = MessageIndex()
+    repeat = list(rows[2])
+    resent = rows[2][:4] + ['2030-01-01 00:00:00']
+    other_sender = rows[2][:2] + ['Someone else'] + rows[2][3:]
+    chunk = rows[:5] + [repeat, resent, other_sender]
+    assert index.new_rows(COLUMNS, chunk) == rows[:5] + [resent, other_sender]
+    assert index.duplicates == 1
+
+
+def test_commit_keeps_and_rollback_forgets(rows, tmp_path):
+    path = str(tmp_path / 'index.sqlite')
+    index = MessageIndex(path)
+    index.new_rows(COLUMNS, rows[:100])
+    index.commit()
+    index.new_rows(COLUMNS, rows[100:200])
+    index.rollback()
+    index.close()
+
+    index = MessageIndex(path)
+    assert index.new_rows(COLUMNS, rows[:200]) == rows[100:200]
+    index.close()
+
+
+def test_older_export_after_newer_matches_full_run(rows, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_export('all.csv', rows)
+    write_export('older.csv', rows[:OLDER_END])
+    write_export('newer.csv', rows[NEWER_START:])
+
+    run_process('--input', 'all.csv', '--no-excel', '--output-dir', 'full')
+    for export in ('newer.csv', 'older.csv'):
+        run_process('--input', export, '--incremental', '--message-index', 'index.sqlite',
+                    '--no-excel', '--output-dir', 'indexed')
+
+    for name in ('requests_by_month.csv', 'requests_summary.json'):
+        assert read_bytes(os.path.join('indexed', name)) == read_bytes(os.path.join('full', name))
+
+
+def test_failed_run_rolls_back_the_index(rows, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_export('all.csv', rows)
+    args = ('--input', 'all.csv', '--incremental', '--message-index', 'index.sqlite',
+            '--no-excel', '--output-dir', 'indexed')
+    # A directory where the JSON summary goes makes the export fail
+    os.makedirs(os.path.join('indexed', 'requests_summary.json'))
+    with pytest.raises(SystemExit):
+        run_process(*args)
+    index = MessageIndex('index.sqlite')
+    assert index.is_empty()
+    index.close()
+
+    os.rmdir(os.path.join('indexed', 'requests_summary.json'))
+    run_process(*args)
+    index = MessageIndex('index.sqlite')
+    assert index.new_rows(COLUMNS, rows) == []
+    index.close()
@@ -0,0 +1,48 @@
+"""
+process_csv with a process pool against the serial path.
+"""
+
+import csv
+
+import pytest
+
+from data_preprocessor import iter_cleaned_rows, process_csv
+from generate_corpus import COLUMNS
+from pipeline import corpus_rows, read_bytes, write_export
+
+CORPUS_ROWS = 2000
+# Small, so the rows are spread over many chunks and out-of-order
+# completions would show
+CHUNK_SIZE = 37
+
+OLD_FORMAT_COLUMNS = [
+    {'message': 'message_text', 'sent_at': 'message_date'}.get(column, column)
+    for column in COLUMNS
+]
+
+
+@pytest.fixture(scope='module', params=['new format', 'old format'])
+def export(request, tmp_path_factory) -> str:
+    path = tmp_path_factory.mktemp('export') / 'raw.csv'
+    rows = corpus_rows(CORPUS_ROWS, seed=5)
+    # A short row, which the cleaner pads like csv.DictReader
+    rows[10] = rows[10][:3]
+    columns = COLUMNS if request.param == 'new format' else OLD_FORMAT_COLUMNS
+    write_export(path, rows, columns)
+    return str(path)
+
+
+def test_output_is_byte_identical_at_any_worker_count(export, tmp_path):
+    serial, parallel = str(tmp_path / 'serial.csv'), str(tmp_path / 'parallel.csv')
+    assert process_csv(export, serial, workers=1, chunk_size=CHUNK_SIZE) == CORPUS_ROWS
+    assert process_csv(export, parallel, workers=3, chunk_size=CHUNK_SIZE) == CORPUS_ROWS
+    assert read_bytes(parallel) == read_bytes(serial)
+
+    with open(serial, encoding='utf-8', newline='') as f:
+        assert sum(1 for _ in csv.reader(f)) == CORPUS_ROWS + 1
+
+
+def test_streamed_rows_match_at_any_worker_count(export):
+    serial = list(iter_cleaned_rows(export, workers=1, chunk_size=CHUNK_SIZE))
+    parallel = list(iter_cleaned_rows(export, workers=3, chunk_size=CHUNK_SIZE))
+    assert parallel == serial
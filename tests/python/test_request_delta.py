@@ -0,0 +1,158 @@
+"""
+DeltaWriter: diffing exports against the previous snapshot, advancing
+the manifest and snapshot index, and dropping staged deltas on failure.
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from pipeline import read_bytes
+from request_delta import (
+    DELTA_DIR, INDEX_FILE, DeltaWriter, read_delta, read_manifest, row_hashes
+)
+from request_extractor import CSV_COLUMNS, RequestExtractor
+from request_table import request_keys
+from test_request_loader import export_frame
+
+REQUESTS = 300
+
+REQUEST = 'can you please update the contact form on the website today'
+
+
+def write_delta(output_dir, df: pd.DataFrame):
+    writer = DeltaWriter(str(output_dir), CSV_COLUMNS)
+    # In two frames, as export_chunked adds them
+    writer.add(df[:100])
+    writer.add(df[100:])
+    return writer.finish()
+
+
+def delta_dir_files(output_dir) -> dict:
+    """File name -> contents of the delta directory."""
+    delta_dir = os.path.join(output_dir, DELTA_DIR)
+    return {name: read_bytes(os.path.join(delta_dir, name)) for name in sorted(os.listdir(delta_dir))}
+
+
+def snapshot_index(output_dir) -> dict:
+    path = os.path.join(output_dir, DELTA_DIR, INDEX_FILE)
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    return dict(zip(df['request_id'], df['row_hash']))
+
+
+def expected_index(df: pd.DataFrame) -> dict:
+    return dict(zip(request_keys(df), row_hashes(df[CSV_COLUMNS])))
+
+
+@pytest.fixture
+def first(tmp_path) -> pd.DataFrame:
+    """The first export, already written as delta 1."""
+    df = export_frame(REQUESTS)
+    write_delta(tmp_path, df)
+    return df
+
+
+def test_first_delta_adds_every_request(tmp_path):
+    df = export_frame(REQUESTS)
+    entry = write_delta(tmp_path, df)
+    assert entry['sequence'] == 1 and entry['base_sequence'] is None
+    assert (entry['additions'], entry['changes'], entry['removals']) == (REQUESTS, 0, 0)
+
+    delta = read_delta(os.path.join(tmp_path, DELTA_DIR, entry['file']))
+    assert list(delta.columns) == ['op', 'request_id'] + CSV_COLUMNS
+    assert set(delta['op']) == {'add'}
+    assert list(delta['request_id']) == list(request_keys(df))
+    assert delta[CSV_COLUMNS].equals(df)
+
+    manifest = read_manifest(os.path.join(tmp_path, DELTA_DIR))
+    assert manifest['deltas'] == [entry] and manifest['snapshot_sequence'] == 1
+    assert snapshot_index(tmp_path) == expected_index(df)
+
+
+def test_adds_changes_and_removals(tmp_path, first):
+    second = export_frame(REQUESTS + 20)
+    changed = second.index < 10
+    second.loc[changed, 'urgency'] = second.loc[changed, 'urgency'].map(
+        {'High': 'Low', 'Medium': 'High', 'Low': 'Medium'}
+    )
+    removed = (first.index >= 100) & (first.index < 115)
+    second = second[~((second.index >= 100) & (second.index < 115))]
+
+    entry = write_delta(tmp_path, second)
+    assert entry['sequence'] == 2 and entry['base_sequence'] == 1
+    assert (entry['additions'], entry['changes'], entry['removals']) == (20, 10, 15)
+    assert entry['total_requests'] == len(second)
+
+    delta = read_delta(os.path.join(tmp_path, DELTA_DIR, entry['file']))
+    by_op = {op: rows for op, rows in delta.groupby('op')}
+    assert list(by_op['add']['request_id']) == list(request_keys(second[REQUESTS - 15:]))
+    assert list(by_op['change']['request_id']) == list(request_keys(second[:10]))
+    assert list(by_op['change']['urgency']) == list(second['urgency'][:10])
+    assert set(by_op['remove']['request_id']) == set(request_keys(first[removed]))
+    assert set(by_op['remove']['description']) == {''}
+
+    manifest = read_manifest(os.path.join(tmp_path, DELTA_DIR))
+    assert [delta['sequence'] for delta in manifest['deltas']] == [1, 2]
+    assert manifest['snapshot_sequence'] == 2
+    assert snapshot_index(tmp_path) == expected_index(second)
+
+
+def test_unchanged_export_writes_no_delta(tmp_path, first):
+    before = delta_dir_files(tmp_path)
+    assert write_delta(tmp_path, first) is None
+    assert delta_dir_files(tmp_path) == before
+
+
+def test_abort_keeps_the_previous_snapshot(tmp_path, first):
+    before = delta_dir_files(tmp_path)
+    writer = DeltaWriter(str(tmp_path), CSV_COLUMNS)
+    writer.add(export_frame(REQUESTS + 5))
+    writer.abort()
+    assert delta_dir_files(tmp_path) == before
+
+    entry = write_delta(tmp_path, export_frame(REQUESTS + 5))
+    assert (entry['sequence'], entry['additions'], entry['changes']) == (2, 5, 0)
+
+
+def messages(count: int, start: str = '2023-03-01 14:00') -> pd.DataFrame:
+    """Cleaned support messages from start on, all of them requests."""
+    dates = pd.date_range(start, periods=count, freq='7min')
+    return pd.DataFrame({
+        'sender': 'Thad Norman',
+        'message_text': [f'{REQUEST} for page {number}' for number in range(count)],
+        'message_date': dates.strftime('%Y-%m-%d %H:%M:%S'),
+    })
+
+
+def test_failed_chunked_export_drops_the_staged_delta(tmp_path):
+    RequestExtractor().export_chunked(iter([messages(50)]), str(tmp_path), excel=False, delta=True)
+    before = delta_dir_files(tmp_path)
+
+    def failing_batches():
+        yield messages(50)
+        yield messages(50, start='2023-04-01 14:00')
+        raise RuntimeError('export interrupted')
+
+    with pytest.raises(RuntimeError):
+        RequestExtractor().export_chunked(failing_batches(), str(tmp_path), excel=False, delta=True)
+    assert delta_dir_files(tmp_path) == before
+
+
+def test_failed_export_drops_the_staged_delta(tmp_path, monkeypatch):
+    extractor = RequestExtractor()
+    extractor.load_dataframe(messages(50))
+    extractor.process_messages()
+    extractor.export_results(str(tmp_path), excel=False, delta=True)
+    before = delta_dir_files(tmp_path)
+
+    def failing_finish(writer):
+        raise OSError('disk full')
+
+    extractor = RequestExtractor()
+    extractor.load_dataframe(messages(60))
+    extractor.process_messages()
+    monkeypatch.setattr(DeltaWriter, 'finish', failing_finish)
+    with pytest.raises(OSError):
+        extractor.export_results(str(tmp_path), excel=False, delta=True)
+    assert delta_dir_files(tmp_path) == before
@@ -0,0 +1,155 @@
+"""
+RequestLoader against the SQLite stand-in of the requests table.
+"""
+
+import random
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from message_times import TIME_LABELS
+from request_delta import DeltaWriter
+from request_extractor import CSV_COLUMNS
+from request_loader import RequestLoader
+from request_table import request_keys
+
+REQUESTS = 500
+# Small, so loads take several full INSERTs and a partial one
+BATCH_SIZE = 7
+
+REQUEST_TYPES = ['Website Update', 'Backup Request', 'Form Update', 'General Request']
+CATEGORIES = ['Support', 'Hosting', 'Forms']
+URGENCIES = ['High', 'Medium', 'Low']
+EFFORTS = ['Small', 'Medium', 'Large']
+
+
+def export_frame(requests: int = REQUESTS, seed: int = 0) -> pd.DataFrame:
+    """Requests as requests_by_month.csv holds them, read back as strings."""
+    rng = random.Random(seed)
+    rows = []
+    for number in range(requests):
+        day = date(2023, 1, 2) + timedelta(days=number // 10)
+        rows.append({
+            'date': day.isoformat(),
+            'time': rng.choice(TIME_LABELS),
+            'month': day.strftime('%Y-%m'),
+            'request_type': rng.choice(REQUEST_TYPES),
+            'category': rng.choice(CATEGORIES),
+            'description': f'Please update page {number} of the site',
+            'urgency': rng.choice(URGENCIES),
+            'effort': rng.choice(EFFORTS),
+        })
+    return pd.DataFrame(rows, columns=CSV_COLUMNS)
+
+
+def table(loader: RequestLoader) -> list:
+    """Every row of the requests table, by id."""
+    return loader.connection.execute('SELECT * FROM requests ORDER BY id').fetchall()
+
+
+def column_values(loader: RequestLoader, columns: str) -> dict:
+    """source_key -> the row's values of columns."""
+    return {
+        row[0]: row[1:] for row in
+        loader.connection.execute(f'SELECT source_key, {columns} FROM requests')
+    }
+
+
+@pytest.fixture
+def url(tmp_path) -> str:
+    return f"sqlite:///{tmp_path / 'requests.db'}"
+
+
+def test_first_load_inserts_every_row(url):
+    loader = RequestLoader(url, BATCH_SIZE)
+    result = loader.load([export_frame()])
+    assert (result['rows'], result['inserted'], result['updated']) == (REQUESTS, REQUESTS, 0)
+    assert result['statements'] == -(-REQUESTS // BATCH_SIZE)
+
+    df = export_frame()
+    rows = loader.connection.execute(
+        'SELECT date, month, description, urgency, effort, status FROM requests ORDER BY id'
+    ).fetchall()
+    assert rows == [
+        (day, day[:7], description, urgency.upper(), effort, 'active')
+        for day, description, urgency, effort
+        in zip(df['date'], df['description'], df['urgency'], df['effort'])
+    ]
+    loader.close()
+
+
+def test_rerun_changes_nothing(url):
+    loader = RequestLoader(url, BATCH_SIZE)
+    loader.load([export_frame()])
+    before = table(loader)
+    # In chunks this time, which must key the requests the same way
+    df = export_frame()
+    result = loader.load([df[:123], df[123:]])
+    assert (result['inserted'], result['updated'], result['unchanged']) == (0, 0, REQUESTS)
+    assert table(loader) == before
+    loader.close()
+
+
+def test_refresh_overwrites_the_classification_only(url):
+    loader = RequestLoader(url, BATCH_SIZE)
+    loader.load([export_frame()])
+    # Dashboard edits, including to a column the extraction sets
+    loader.connection.execute(
+        "UPDATE requests SET category = 'Forms', description = 'Edited', "
+        "website_url = 'https://example.com', billing_date = '2023-02-01', "
+        "status = 'ignored' WHERE id % 3 = 0"
+    )
+    edited = table(loader)
+    dashboard_columns = column_values(loader, 'website_url, billing_date, status')
+
+    reclassified = export_frame().assign(
+        request_type='SSL Certificate', category='Hosting', urgency='High', effort='Large'
+    )
+    result = loader.load([reclassified])
+    assert (result['inserted'], result['updated']) == (0, 0)
+    assert table(loader) == edited
+    loader.close()
+
+    loader = RequestLoader(url, BATCH_SIZE, refresh=True)
+    result = loader.load([reclassified])
+    assert (result['inserted'], result['updated']) == (0, REQUESTS)
+    descriptions = dict(zip(request_keys(reclassified), reclassified['description']))
+    assert column_values(loader, 'request_type, category, description, urgency, effort') == {
+        key: ('SSL Certificate', 'Hosting', description, 'HIGH', 'Large')
+        for key, description in descriptions.items()
+    }
+    assert column_values(loader, 'website_url, billing_date, status') == dashboard_columns
+
+    # Nothing left to overwrite
+    result = loader.load([reclassified])
+    assert (result['updated'], result['unchanged']) == (0, REQUESTS)
+    loader.close()
+
+
+def test_delta_loads_soft_delete_and_restore(url, tmp_path):
+    def load_delta(df: pd.DataFrame) -> dict:
+        writer = DeltaWriter(str(tmp_path), CSV_COLUMNS)
+        writer.add(df)
+        entry = writer.finish()
+        return loader.load_delta(str(tmp_path / 'deltas' / entry['file']))
+
+    full = export_frame()
+    removed = full.index % 5 == 0
+    loader = RequestLoader(url, BATCH_SIZE)
+
+    result = load_delta(full)
+    assert (result['inserted'], result['deleted']) == (REQUESTS, 0)
+    ids = column_values(loader, 'id')
+
+    result = load_delta(full[~removed])
+    assert (result['inserted'], result['updated'], result['deleted']) == (0, 0, removed.sum())
+    statuses = column_values(loader, 'status')
+    removed_keys = set(request_keys(full[removed]))
+    assert {key for key, (status,) in statuses.items() if status == 'deleted'} == removed_keys
+
+    result = load_delta(full)
+    assert (result['inserted'], result['updated'], result['deleted']) == (0, removed.sum(), 0)
+    assert set(column_values(loader, 'status').values()) == {('active',)}
+    assert column_values(loader, 'id') == ids
+    loader.close()